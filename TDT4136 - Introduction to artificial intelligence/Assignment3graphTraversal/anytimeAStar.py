@@ -0,0 +1,206 @@
+
+#Anytime Repairing A* (ARA*) on the cost model of astarPart2 (a move costs
+#the value of the cell that is entered, 0 blocks the cell).
+#A first path is found quickly with the heuristic inflated by a weight w, its
+#cost is at most w times the optimal cost. The weight is then lowered step
+#by step and the path improved, reusing the earlier search: a node whose g
+#value goes down after it was expanded in the current round is not expanded
+#again in that round, it is kept in an inconsistent set and put back in the
+#open set for the next round. After every round the suboptimality bound of
+#the current path is
+# min(w, cost / min over the opened and inconsistent nodes of g + h)
+#The search stops when the bound is down to the target (1 is optimal) or the
+#time or expansion budget is used up, and keeps the best path found so far.
+#See Likhachev, Gordon and Thrun, "ARA*: Anytime A* with Provable Bounds on
+#Sub-Optimality" (NIPS 2003).
+
+import time
+from array import array
+
+import numpy as np
+
+from indexedHeap import IndexedHeap
+
+INF = float("inf")
+#the weight of the first round and how much it is lowered after every round
+WEIGHT = 2.5
+STEP = 0.5
+#the clock is read every this many expansions
+CLOCK_EXPANSIONS = 64
+
+
+class AnytimeAStar():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#start - The starting node
+	#goal - The ending node
+	#weight - the inflation of the heuristic in the current round
+	#step - how much the weight is lowered after every round
+	#bounds - heuristic of every node as an array (ALT, see landmarks.py), or
+	#None for min cost times the manhattan distance
+	#g - cost from the start of each reached node
+	#parent - the node each node was reached from
+	#opened - indexed heap of the opened nodes, keyed by g + weight * h
+	#closed - the round each node was last expanded in (-1 if never)
+	#incons - nodes whose g went down after they were expanded in this round
+	#path, cost, bound - the best path found so far, its cost and its suboptimality bound
+	#solutions - (seconds, expanded, cost, bound) of every improvement of the path
+	#expanded - nodes expanded over all rounds
+	def __init__(self, grid, start=None, goal=None, weight=WEIGHT, step=STEP, bounds=None):
+		self.grid = grid
+		self.start = grid.start if start is None else start
+		self.goal = grid.goal if goal is None else goal
+		self.weight = float(weight)
+		self.step = step
+		self.bounds = bounds
+		self.min_cost = grid.get_min_cost()
+		self.g = {}
+		self.parent = {}
+		self.opened = None
+		self.closed = None
+		self.incons = set()
+		self.round = 0
+		self.path = []
+		self.cost = None
+		self.bound = None
+		self.solutions = []
+		self.expanded = 0
+
+	def get_heuristic(self, node):
+		if self.bounds is not None:
+			return int(self.bounds[node])
+		return self.min_cost * self.grid.get_heuristic(node, self.goal)
+
+	def get_key(self, node):
+		return self.g[node] + self.weight * self.get_heuristic(node)
+
+	def improve_path(self, deadline=None, max_expanded=None):
+		#Expand nodes until no opened node can lead to a cheaper path to the
+		#goal under the current weight. Returns False if the budget ran out first
+		grid = self.grid
+		costs = grid.costs
+		opened = self.opened
+		closed = self.closed
+		incons = self.incons
+		g = self.g
+		parent = self.parent
+		goal = self.goal
+		current = self.round
+		weight = self.weight
+		while len(opened) and g.get(goal, INF) > opened.top_key():
+			if max_expanded is not None and self.expanded >= max_expanded:
+				return False
+			if deadline is not None and self.expanded % CLOCK_EXPANSIONS == 0 and time.time() > deadline:
+				return False
+			node = opened.pop()
+			closed[node] = current
+			self.expanded += 1
+			for adj in grid.get_neighbours(node):
+				new = g[node] + int(costs[adj])
+				if new >= g.get(adj, INF):
+					continue
+				g[adj] = new
+				parent[adj] = node
+				if closed[adj] == current:
+					incons.add(adj)
+					continue
+				key = new + weight * self.get_heuristic(adj)
+				if adj in opened:
+					opened.decrease_key(adj, key)
+				else:
+					opened.push(adj, key)
+		return True
+
+	def get_lower_bound(self):
+		#a lower bound on the optimal cost, INF if no node is left to search
+		g = self.g
+		nodes = self.opened.nodes() + list(self.incons)
+		if not nodes:
+			return INF
+		return min(g[node] + self.get_heuristic(node) for node in nodes)
+
+	def get_bound(self):
+		#the suboptimality bound of the current path
+		if self.cost == 0:
+			return 1.0
+		return max(1.0, min(self.weight, self.cost / float(self.get_lower_bound())))
+
+	def read_path(self):
+		#return the path to the goal from the parent links. Its cost can be
+		#below g of the goal, when nodes on it got cheaper after the goal was reached
+		path = [self.goal]
+		while path[-1] != self.start:
+			path.append(self.parent[path[-1]])
+		path.reverse()
+		return path
+
+	def start_round(self):
+		#Lower the weight and put the opened and inconsistent nodes back in
+		#the open set, keyed with the new weight
+		self.weight = max(1.0, self.weight - self.step)
+		self.round += 1
+		nodes = self.opened.nodes() + list(self.incons)
+		peak = self.opened.peak
+		self.incons = set()
+		self.opened = IndexedHeap(len(self.grid))
+		for node in nodes:
+			self.opened.push(node, self.get_key(node))
+		#(the peak is over all rounds)
+		self.opened.peak = max(peak, self.opened.peak)
+
+	def process(self, budget=None, max_expanded=None, bound=1.0, report=None):
+		#Search until the path is within bound of the optimal cost, or the
+		#budget (seconds, and/or a number of expansions) is used up. report is
+		#called with (path, cost, bound) on every improvement of the path.
+		#Returns True if a path was found.
+		begin = time.time()
+		deadline = None if budget is None else begin + budget
+		self.g = {self.start: 0}
+		self.parent = {}
+		self.closed = array("i", [-1]) * len(self.grid)
+		self.incons = set()
+		self.round = 0
+		self.opened = IndexedHeap(len(self.grid))
+		self.opened.push(self.start, self.get_key(self.start))
+		self.path, self.cost, self.bound = [], None, None
+		self.solutions = []
+		self.expanded = 0
+		while True:
+			finished = self.improve_path(deadline, max_expanded)
+			cost = self.g.get(self.goal)
+			if cost is not None and (self.cost is None or cost < self.cost):
+				self.path = self.read_path()
+				self.cost = sum(int(self.grid.costs[node]) for node in self.path[1:])
+				if finished:
+					self.bound = self.get_bound()
+				else:
+					#the round was cut short, its weight does not bound the path
+					lower = self.get_lower_bound()
+					self.bound = max(1.0, min(self.bound or INF, self.cost / float(lower) if lower else INF))
+				self.solutions.append((time.time() - begin, self.expanded, self.cost, self.bound))
+				if report is not None:
+					report(self.path, self.cost, self.bound)
+			elif finished and self.cost is not None:
+				#no better path with this weight, but the bound may be tighter now
+				self.bound = min(self.bound, self.get_bound())
+			if not finished or self.cost is None:
+				#out of budget, or there is no path at all
+				break
+			if self.bound <= bound or self.weight <= 1.0:
+				break
+			self.start_round()
+		return self.cost is not None
+
+	def get_path(self):
+		return self.path
+
+	def get_closed(self):
+		#return the nodes expanded in any round
+		if self.closed is None:
+			return set()
+		return set(np.flatnonzero(np.frombuffer(self.closed, np.int32) >= 0).tolist())
+
+	def get_opened(self):
+		if self.opened is None:
+			return []
+		return self.opened.nodes()
@@ -1,235 +1,201 @@
 
-import heapq
-from collections import deque
-from PIL import Image, ImageDraw
-
-
-class Cell():
-	#Class for each cell (1x1) of the board with parameters: 
-	# x - the x coordinate of the cell
-	# y - the y coordinate of the cell
-	# parent - allows relations between the cells on a path
-	# g - cost from start cell to current cell
-	# h - heuristic cost from current cell to goal cell
-	# f = g + h - the expected cost function
-	def __init__(self, x, y, value):
-		self.value = value
-		self.x = x
-		self.y = y
-		self.parent = None
-		self.g = 0
-		self.h = 0
-		self.f = 0
-
-	#Override of < to make heap work properly
-	def __lt__(self, other):
-		return self.f < other.f
+import sys
+from grid import load_board
+from anytimeAStar import AnytimeAStar
+from bestFirstSearch import BestFirstSearch
+from bidirectional import BidirectionalSearch
+from distanceField import get_field
+from hierarchical import HierarchicalAStar
+from instrument import SearchStats, TraceWriter, count_open_set
+from landmarks import Landmarks
+import render
+
+
+#time budget (seconds) and target suboptimality bound of the anytime mode (alg 9)
+ANYTIME_BUDGET = 0.005
+ANYTIME_BOUND = 1.2
+
 
 class AStar():
 	#The main class of the algorithm with parameters:
-	#
-	#
-	#
-	#
-	#
-	#
-	#
-	#
+	#grid - the board as a Grid of flat arrays, see grid.py
+	#costs - cost of entering each node (uint8 array)
+	#grid_height - The height of the grid
+	#grid_width - The width of the grid
+	#start - The starting node
+	#goal - The ending node
+	#search - the search object that found the path, see bestFirstSearch.py
+	#for A*, BFS, Dijkstra and ALT, None for the distance field
+	#landmarks - the ALT distance tables of the board (alg 7), None otherwise
+	#bounds - the ALT heuristic of every node for the goal (alg 7)
+	#stats - counters and phase timers of the last search, see instrument.py
+	#hook - optional SearchHook told about the opened and expanded nodes, None for no events
+	#Nodes are plain integers, node = x * grid_height + y
 	def __init__(self):
-		self.opened = []
-		if (alg == 2):
-			self.opened = deque(self.opened)
-		else:
-			heapq.heapify(self.opened)
-		self.closed = set()
-		self.cells = []
+		self.search = None
+		self.landmarks = None
+		self.bounds = None
+		self.stats = SearchStats()
+		self.hook = None
+		self.grid = None
+		self.costs = None
 		self.grid_height = 0
 		self.grid_width = 0
 		self.start = None
 		self.goal = None
 
 	def get_closed(self):
-		return self.closed
+		#return the set of closed nodes of the search
+		if self.search is None:
+			#no search was run (distance field)
+			return set()
+		return self.search.get_closed()
 
 	def get_opened(self):
-		tmp = []
-		for cell in self.opened:
-			tmp.append(cell[1])
-		return tmp
+		if self.search is None:
+			return []
+		return self.search.get_opened()
 
 	#Initialize the grid from the txt-file
 	def init_grid(self):
-		with open(filename) as f:
-			grid = f.read().splitlines()
-		self.grid_width = len(grid)
-		self.grid_height = len(grid[0])
-		start = []
-		goal = []
-		for x in range(self.grid_width):
-			for y in range(self.grid_height):
-				ch = grid[x][y]
-				if(ch=='w'):
-					value = 100
-				elif(ch=='m'):
-					value = 50
-				elif(ch=='f'):
-					value = 10
-				elif(ch=='g'):
-					value = 5
-				elif(ch=='r'):
-					value = 1
-				elif (ch == "A"):
-					start = [x,y]
-				elif (grid[x][y] == "B"):
-					goal = [x,y]
-				self.cells.append(Cell(x, y, value))
-		self.start = self.get_cell(start[0],start[1])
-		self.goal = self.get_cell(goal[0],goal[1])
-
-	def get_cell(self, x, y):
-		#return the cell object corresponding to a given coordinate.
-		return self.cells[x * self.grid_height + y]
-
-	def get_heuristic(self, cell):
-		if (alg == 3):
-			#Dijkstra
-			return 0
-		else:
-			return (abs(cell.x - self.goal.x) + abs(cell.y - self.goal.y))
-
-	def get_neighbours(self, cell):
-		#return list of neighbouring cells clockwise starting from the rightmost one
-		cells = []
-		if cell.x < self.grid_width-1:
-			cells.append(self.get_cell(cell.x+1, cell.y))
-		if cell.y > 0:
-			cells.append(self.get_cell(cell.x, cell.y-1))
-		if cell.x > 0:
-			cells.append(self.get_cell(cell.x-1, cell.y))
-		if cell.y < self.grid_height-1:
-			cells.append(self.get_cell(cell.x, cell.y+1))
-		return cells
-
-	def display_path(self):
-		#Keep track of the path
-		cell = self.goal
-		while cell.parent is not self.start:
-			cell = cell.parent
-			#print('path: cell: %d,%d' % (cell.x, cell.y))
-			pathList.append((cell.x, cell.y))
-
-	def update_cell(self, adj, cell):
-		#given a cell and a neighbour, update the neighbours expected cost and give parent-child relation between them
-		adj.g = cell.g + adj.value
-		adj.h = self.get_heuristic(adj)
-		adj.parent = cell
-		adj.f = adj.g + adj.h 
-	
+		self.grid = load_board(filename)
+		self.costs = self.grid.costs
+		self.grid_width = self.grid.grid_width
+		self.grid_height = self.grid.grid_height
+		self.start = self.grid.start
+		self.goal = self.grid.goal
+
+	def get_index(self, x, y):
+		#return the node corresponding to a given coordinate.
+		return x * self.grid_height + y
+
+	def store_path(self, path):
+		#Keep the cells of the path between start and goal in pathList, from
+		#the goal back to the start
+		for node in reversed(path[1:-1]):
+			pathList.append(self.grid.get_coords(node))
+
+	def process_best_first(self):
+		#A* (alg 1), BFS (alg 2), Dijkstra (alg 3) or A* with the ALT heuristic
+		#(alg 7), see bestFirstSearch.py. The hook is told about every node
+		#that is opened or expanded. Returns the path, [] if there is none
+		if (alg == 7):
+			#the ALT distance tables are loaded from (or saved to) a file next to the board
+			self.landmarks = Landmarks(self.grid, filename)
+			self.bounds = self.landmarks.get_bounds(self.goal)
+		self.search = BestFirstSearch(self.grid, self.start, self.goal, heuristic=(alg != 3), fifo=(alg == 2),
+			bounds=self.bounds, hook=self.hook)
+		self.search.process()
+		stats = self.search.stats
+		self.stats.expansions = stats.expansions
+		self.stats.pushes = stats.pushes
+		self.stats.decrease_keys = stats.decrease_keys
+		self.stats.peak = stats.peak
+		return self.search.get_path()
+
+	def process_hierarchical(self):
+		#Hierarchical A*, see hierarchical.py. The abstract graph is loaded from
+		#(or saved to) a file next to the board. Returns the refined path
+		self.search = HierarchicalAStar(self.grid, filename)
+		path = list(self.search.get_path(self.start, self.goal))
+		if self.search.opened is not None:
+			count_open_set(self.stats, self.search.opened)
+		#(expanded also counts the nodes of the searches inside the clusters)
+		self.stats.expansions = self.search.expanded
+		return path
+
+	def process_bidirectional(self):
+		#Bidirectional A* (alg 5) or Dijkstra (alg 6), see bidirectional.py.
+		#Returns the path through the meeting node
+		self.search = BidirectionalSearch(self.grid, self.start, self.goal, heuristic=(alg == 5))
+		self.search.process()
+		for opened in self.search.opened:
+			count_open_set(self.stats, opened)
+		return self.search.get_path()
+
+	def process_anytime(self):
+		#Anytime A* (ARA*) with the ALT heuristic, see anytimeAStar.py. The
+		#first path is found with an inflated heuristic and improved until it
+		#is within ANYTIME_BOUND of the optimal cost or ANYTIME_BUDGET is used up.
+		#Returns the best path found
+		self.landmarks = Landmarks(self.grid, filename)
+		self.search = AnytimeAStar(self.grid, self.start, self.goal, bounds=self.landmarks.get_bounds(self.goal))
+		self.search.process(budget=ANYTIME_BUDGET, bound=ANYTIME_BOUND)
+		self.stats.expansions = self.search.expanded
+		self.stats.peak = self.search.opened.peak
+		return self.search.get_path()
+
+	def process_field(self):
+		#Read the path from the distance field of the goal, see distanceField.py.
+		#The field is computed once per board and goal and kept in a cache
+		return get_field(self.grid, self.goal).get_path(self.start)
+
 	def process(self):
-		self.init_grid()
-		#Start node is added to open heap queue or queue
-		if (alg == 2):
-			self.opened.append((self.start.f, self.start))
+		stats = self.stats = SearchStats()
+		hook = self.hook
+		with stats.phase("load"):
+			self.init_grid()
+		if (alg in [1,2,3,7]):
+			#the best-first search tells the hook about the whole search itself
+			with stats.phase("search"):
+				path = self.process_best_first()
 		else:
-			heapq.heappush(self.opened, (self.start.f, self.start))
-		#main loop invariant - continues as long as there are opened cells
-		while (len(self.opened)):
-			#pop the first element from the heap, i.e. the cell with lowest f value.
-			if (alg == 2):
-				f, cell = self.opened.popleft()
-			else:
-				f, cell = heapq.heappop(self.opened)
-			#add the cell to the set of closed cells.
-			self.closed.add(cell)
-			#if the current cell is the goal cell we are done.
-			if cell is self.goal:
-				self.display_path()
-				break
-			#loop through list of adjecent cells
-			adj_cells = self.get_neighbours(cell)
-			for adj_cell in adj_cells:
-				if adj_cell not in self.closed:
-					if (adj_cell.f, adj_cell) in self.opened:
-						#if neighbouring cell is opened we need to see if the path is better:
-						if adj_cell.g > cell.g + adj_cell.value:
-							#if the new path is better, update current adjacent cell.
-							self.update_cell(adj_cell, cell)
-					else:
-						#adjacent cell not opened, therefore update and push to heap to explore path further
-						self.update_cell(adj_cell, cell)
-						if (alg == 2):
-							self.opened.append((adj_cell.f, adj_cell))
-						else:
-							heapq.heappush(self.opened, (adj_cell.f, adj_cell))
-						
-
-
-choice = input("Choose map: 1,2,3 or 4 \n")
-while(choice not in [1,2,3,4]):
-	choice = input("Not a valid value, please try again \n")
-
-
-alg = input("Choose algorithm: \n 1: A* search \n 2: BFS \n 3: Dijkstra \n")
-while(alg not in [1,2,3]):
-	alg = input()
-
-filename = "boards/board-2-" + str(choice) + ".txt"
-pathList = []
-a = AStar()
-path = a.process()
-
-
-with open(filename) as f:
- 	grid = f.read().splitlines()
-out = open("out/outBoard2-" + str(choice) + str(alg) + ".txt",'w')
-for x in range(a.grid_width):
- 	for y in range(a.grid_height):
-			out.write(grid[x][y])
-	out.write('\n')
-out.close()
-
-
-im = Image.new("RGB", (20*a.grid_height, 20*a.grid_width), (255, 255, 255))
-draw = ImageDraw.Draw(im)
-
-
-closed = a.get_closed()
-opened = a.get_opened()
-for x in range(a.grid_width):
-	for y in range(a.grid_height-1, -1, -1):
- 		if (a.get_cell(x,y).value == 100):
- 			#draw black square dimension 20x20
- 			draw.rectangle(((20*y,20*x), (20*(y+1), 20*(x+1))) , fill=(30,144,255), outline=(30,144,255))
- 		elif (a.get_cell(x,y).value == 50):
- 			draw.rectangle(((20*y,20*x), (20*(y+1), 20*(x+1))) , fill=(169,169,169), outline=(169,169,169))
- 		elif (a.get_cell(x,y).value == 10):
- 			draw.rectangle(((20*y,20*x), (20*(y+1), 20*(x+1))) , fill=(0,100,0), outline=(0,100,0))
- 		elif (a.get_cell(x,y).value == 5):
- 			draw.rectangle(((20*y,20*x), (20*(y+1), 20*(x+1))) , fill=(152,251,152), outline=(152,251,152))
- 		elif (a.get_cell(x,y).value == 1):
- 			draw.rectangle(((20*y,20*x), (20*(y+1), 20*(x+1))) , fill=(205,133,63), outline=(205,133,63))
- 		if ((x,y) in pathList):
- 			#draw blue circle
- 			draw.ellipse(((20*y+7,20*x+7), (20*y+7+4, 20*x+7+4)) , fill=(0,0,0), outline=(0,0,0))
- 		elif (grid[x][y]=="B"):
- 			draw.ellipse(((20*y+7,20*x+7), (20*y+7+4, 20*x+7+4)) , fill=(124,252,0), outline=(124,252,0))
- 		elif (grid[x][y]=="A"):
- 			draw.ellipse(((20*y+7,20*x+7), (20*y+7+4, 20*x+7+4)) , fill=(255,0,0), outline=(255,0,0))
- 		elif (a.get_cell(x,y) in closed):
- 			#draw x
- 			draw.line(((20*y+6,20*x+6), (20*y+14, 20*x+14)), fill=(40,40,40), width = 1)
- 			draw.line(((20*y+6,20*x+14), (20*y+14, 20*x+6)), fill=(40,40,40), width = 1)
- 		elif (a.get_cell(x,y) in opened):
- 			#draw.ellipse(((20*y+7,20*x+7), (20*y+7+4, 20*x+7+4)) , fill=(255,55,0), outline=(255,55,0))
- 			draw.polygon(((20*y + 5.5, 20*x + 8), (20*y + 9.5, 20*x +13), (20*y + 13.5, 20*x + 8)), fill=(55,55,55))
-			draw.polygon(((20*y + 5.5, 20*x + 11), (20*y + 9.5, 20*x + 6), (20*y + 13.5, 20*x + 11)), fill=(55,55,55))
-del draw
-im.save("out/IMG/test2-" + str(choice) + str(alg) + ".png", "PNG")
-
-#implement total price print.
-cost = 0
-for (x,y) in pathList:
-	cost += a.get_cell(x,y).value
-print cost
-
-
+			#modes run by other search objects, the hook only sees their path
+			if hook is not None:
+				hook.begin(self.grid)
+			with stats.phase("search"):
+				if (alg == 4):
+					path = self.process_hierarchical()
+				elif (alg in [5,6]):
+					path = self.process_bidirectional()
+				elif (alg == 9):
+					path = self.process_anytime()
+				else:
+					path = self.process_field()
+			if hook is not None:
+				hook.done(path)
+		with stats.phase("path"):
+			self.store_path(path)
+
+
+
+if __name__ == "__main__":
+	choice = input("Choose map: 1,2,3 or 4 \n")
+	while(choice not in [1,2,3,4]):
+		choice = input("Not a valid value, please try again \n")
+
+
+	alg = input("Choose algorithm: \n 1: A* search \n 2: BFS \n 3: Dijkstra \n 4: Hierarchical A* \n 5: Bidirectional A* \n 6: Bidirectional Dijkstra \n 7: A* with landmarks (ALT) \n 8: Distance field of the goal \n 9: Anytime A* (ARA*) \n")
+	while(alg not in [1,2,3,4,5,6,7,8,9]):
+		alg = input()
+
+	filename = "boards/board-2-" + str(choice) + ".txt"
+	pathList = []
+	a = AStar()
+	if len(sys.argv) > 1:
+		#stream the search to a trace file, see instrument.py for the replay
+		a.hook = TraceWriter(sys.argv[1])
+	path = a.process()
+	if (alg in [5,6] and a.search.meeting is not None):
+		print "meeting point: %d,%d" % a.grid.get_coords(a.search.meeting)
+		print "expanded: %d forward, %d backward" % tuple(a.search.expanded)
+	if (alg == 9):
+		for (seconds, expanded, cost, bound) in a.search.solutions:
+			print "path of cost %d within %.3f of the optimum after %.1f ms, %d nodes expanded" % (cost, bound, 1000 * seconds, expanded)
+
+
+	with open(filename) as f:
+		grid = f.read().splitlines()
+	#text and image output, see render.py
+	with a.stats.phase("render"):
+		render.write_text("out/outBoard2-" + str(choice) + str(alg) + ".txt", grid, a.grid)
+		cells = {"path": pathList, "start": [a.start], "goal": [a.goal], "closed": a.get_closed(), "opened": a.get_opened()}
+		im = render.render(a.grid, render.WEIGHTED_COLOURS, render.WEIGHTED_MARKERS, cells)
+		im.save("out/IMG/test2-" + str(choice) + str(alg) + ".png", "PNG")
+	print a.stats
+
+	#implement total price print.
+	cost = 0
+	for (x,y) in pathList:
+		cost += a.costs[a.get_index(x,y)]
+	print cost
@@ -0,0 +1,166 @@
+
+#Benchmark of the script modes on one large generated board: expansion rate
+#of AStar.process (unidirectional, bidirectional and ALT), many starts to one
+#goal with A* against a distance field, path repair with D* Lite against
+#replanning, and the nodes expanded by A* and Jump Point Search on an open
+#uniform board. See benchmarkSuite.py for the scaling benchmark of every mode
+#on a corpus of boards, with results that can be compared to a baseline.
+#Usage: python benchmark.py [size]   (default size is 1000, i.e. a 1000x1000 board)
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import astarPart1
+import astarPart2
+from dStarLite import DStarLite
+from distanceField import FieldCache
+from grid import load_board
+from indexedHeap import CLOSED
+
+ALGORITHMS = {1: "A*", 2: "BFS", 3: "Dijkstra", 5: "Bidir A*", 6: "Bidir Dij", 7: "ALT"}
+UNIFORM_ALGORITHMS = {1: "A*", 2: "JPS"}
+#number of starts sent to the same goal
+AGENTS = 10
+#number of cost change batches, and cells of the path flooded by each batch
+REPAIRS = 5
+FLOOD = 10
+
+
+def write_board(filename, size, seed=0):
+	#Write a random weighted board (board-2-* format) with the start next to the
+	#top left corner and the goal in the bottom right corner
+	rnd = random.Random(seed)
+	terrain = "rrrggggffffmmw"
+	rows = []
+	for x in range(size):
+		rows.append("".join(rnd.choice(terrain) for y in range(size)))
+	rows[0] = rows[0][0] + "A" + rows[0][2:]
+	rows[-1] = rows[-1][:-1] + "B"
+	with open(filename, "w") as f:
+		f.write("\n".join(rows) + "\n")
+
+
+def write_uniform_board(filename, size, walls=40, seed=0):
+	#Write an open board (board-1-* format) with a number of straight walls
+	#like the ones in the board-1-* maps
+	rnd = random.Random(seed)
+	rows = [["."] * size for x in range(size)]
+	for i in range(walls):
+		x, y = rnd.randrange(size), rnd.randrange(size)
+		length = rnd.randrange(size // 4)
+		for k in range(length):
+			if i % 2 == 0 and y + k < size:
+				rows[x][y + k] = "#"
+			elif i % 2 == 1 and x + k < size:
+				rows[x + k][y] = "#"
+	rows[0][0] = "A"
+	rows[-1][-1] = "B"
+	with open(filename, "w") as f:
+		f.write("\n".join("".join(row) for row in rows) + "\n")
+
+
+def run(filename, alg, module=astarPart2):
+	#Run one search and return (seconds, expanded nodes)
+	module.filename = filename
+	module.alg = alg
+	module.pathList = []
+	a = module.AStar()
+	begin = time.time()
+	a.process()
+	seconds = time.time() - begin
+	if getattr(a, "stats", None) is not None:
+		#astarPart2, the bidirectional modes count both directions together
+		return seconds, a.stats.expansions
+	expanded = sum(1 for p in a.opened.pos if p == CLOSED)
+	return seconds, expanded
+
+
+class AgentAStar(astarPart2.AStar):
+	#AStar.process from a given start instead of the 'A' of the board
+	def __init__(self, start):
+		astarPart2.AStar.__init__(self)
+		self.agent = start
+
+	def init_grid(self):
+		astarPart2.AStar.init_grid(self)
+		self.start = self.agent
+
+
+def run_agents(filename, agents=AGENTS, seed=0):
+	#Send a number of random starts to the goal of a board, with one A* per
+	#start and with a distance field of the goal. Returns the seconds of both.
+	rnd = random.Random(seed)
+	grid = load_board(filename)
+	starts = [node for node in rnd.sample(range(len(grid)), agents) if grid.costs[node]]
+	astarPart2.filename = filename
+	astarPart2.alg = 1
+	begin = time.time()
+	for start in starts:
+		astarPart2.pathList = []
+		AgentAStar(start).process()
+	astar_seconds = time.time() - begin
+	begin = time.time()
+	grid = load_board(filename)
+	field = FieldCache().get_field(grid, grid.goal)
+	for start in starts:
+		field.get_path(start)
+	return astar_seconds, time.time() - begin
+
+
+def run_repair(filename, repairs=REPAIRS, flood=FLOOD, seed=0):
+	#Flood a stretch of the current path a number of times and repair the
+	#path with D* Lite, against planning again from scratch on the changed
+	#board. Returns lists of (seconds, expanded) for repairs and full plans.
+	rnd = random.Random(seed)
+	grid = load_board(filename)
+	planner = DStarLite(grid)
+	planner.process()
+	repaired, planned = [], []
+	for i in range(repairs):
+		path = planner.get_path()
+		if len(path) < flood + 2:
+			break
+		#the flood is just ahead of the agent, where it would see the change.
+		#(The search runs from the goal, so changes near the goal cost more to repair.)
+		first = rnd.randrange(1, max(2, (len(path) - flood) // 3))
+		planner.update_costs([(node, 100) for node in path[first:first + flood]])
+		begin = time.time()
+		planner.process()
+		repaired.append((time.time() - begin, planner.expanded))
+		full = DStarLite(grid)
+		begin = time.time()
+		full.process()
+		planned.append((time.time() - begin, full.expanded))
+		assert full.get_cost() == planner.get_cost()
+	return repaired, planned
+
+
+if __name__ == "__main__":
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	tmp = tempfile.mkdtemp()
+	try:
+		filename = os.path.join(tmp, "board.txt")
+		write_board(filename, size)
+		print("%dx%d board" % (size, size))
+		for alg in sorted(ALGORITHMS):
+			seconds, expanded = run(filename, alg)
+			if alg == 7:
+				#the first run builds the landmark tables, the second one loads them
+				seconds, expanded = run(filename, alg)
+			print("%-9s expanded %8d nodes in %7.2f s, %9.0f nodes/s" % (ALGORITHMS[alg], expanded, seconds, expanded / seconds))
+		astar_seconds, field_seconds = run_agents(filename)
+		print("%d starts to the same goal: A* %.2f s, distance field %.2f s" % (AGENTS, astar_seconds, field_seconds))
+		repaired, planned = run_repair(filename)
+		for (seconds, expanded), (full_seconds, full_expanded) in zip(repaired, planned):
+			print("repair %7d nodes in %6.2f s, full replanning %7d nodes in %6.2f s" % (expanded, seconds, full_expanded, full_seconds))
+		write_uniform_board(filename, size)
+		print("%dx%d uniform board" % (size, size))
+		for alg in sorted(UNIFORM_ALGORITHMS):
+			seconds, expanded = run(filename, alg, astarPart1)
+			print("%-9s expanded %8d nodes in %7.2f s" % (UNIFORM_ALGORITHMS[alg], expanded, seconds))
+	finally:
+		shutil.rmtree(tmp)
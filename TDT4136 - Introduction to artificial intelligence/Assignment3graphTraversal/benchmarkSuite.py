@@ -0,0 +1,225 @@
+
+#Scaling benchmark of every search mode on a generated corpus of boards.
+#The boards are seeded random maps in the txt-board format, of a few kinds
+#(see MAPS: obstacle density and terrain mix) and sizes from 64x64 up to
+#8192x8192, generated once into a corpus directory and reused afterwards.
+#Every mode of pathfinding.py is run from 'A' (top left) to 'B' (bottom right)
+#and the run records the path cost, the nodes expanded, the peak open set,
+#the best time of a number of repeats, the time of the precomputation of the
+#mode (HPA* graph, ALT tables) and the peak memory of one query (Python 3,
+#traced with tracemalloc in an untimed warm-up run, so it does not slow down
+#the timing).
+#The results are written as JSON and can be compared against a stored
+#baseline: the exit status is 1 if a path cost changed or a metric got worse
+#than the baseline by more than its threshold (time has a looser one, it is
+#the only metric that is not the same from one run to the next).
+#Usage: python benchmarkSuite.py [--sizes 64,256,1024] [--maps open,weighted]
+#   [--algorithms astar,jps] [--out results.json]
+#   [--baseline baseline.json [--update-baseline]] [--threshold 1.1] [--time-threshold 1.5]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+try:
+	import tracemalloc
+except ImportError:
+	#Python 2, the memory of the runs is not recorded
+	tracemalloc = None
+
+from pathfinding import ALGORITHMS, Board, find_path
+
+timer = getattr(time, "perf_counter", time.time)
+
+CORPUS_DIR = "corpus"
+SIZES = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+DEFAULT_SIZES = [64, 128, 256]
+#map kind -> (share of every terrain character among the free cells, share of blocked cells).
+#weighted uses the terrain mix of the board-2-* maps
+MAPS = {
+	"open": ({".": 1}, 0.1),
+	"dense": ({".": 1}, 0.3),
+	"weighted": ({"r": 3, "g": 4, "f": 4, "m": 2, "w": 1}, 0.0),
+	"mixed": ({"r": 3, "g": 4, "f": 4, "m": 2, "w": 1}, 0.2),
+}
+#rows generated at a time, so large boards do not need a float per cell at once
+BLOCK_ROWS = 256
+#a run regresses if a metric is above threshold times the baseline
+THRESHOLD = 1.1
+TIME_THRESHOLD = 1.5
+#differences below these are noise, not regressions
+MIN_SECONDS = 0.05
+MIN_BYTES = 64 * 1024
+METRICS = [("seconds", MIN_SECONDS), ("expanded", 0), ("peak", 0), ("memory", MIN_BYTES)]
+
+
+def corpus_filename(directory, kind, size, seed):
+	return os.path.join(directory, "%s-%d-%d.txt" % (kind, size, seed))
+
+
+def generate_board(filename, kind, size, seed=0):
+	#Write a random board of a kind with the start in the top left corner and
+	#the goal in the bottom right corner. The same seed gives the same board.
+	terrain, density = MAPS[kind]
+	chars = sorted(terrain)
+	codes = np.frombuffer("".join(chars).encode("ascii"), np.uint8)
+	shares = np.cumsum([terrain[ch] for ch in chars], dtype=float)
+	shares /= shares[-1]
+	rnd = np.random.RandomState(seed)
+	with open(filename, "wb") as f:
+		for first in range(0, size, BLOCK_ROWS):
+			rows = min(BLOCK_ROWS, size - first)
+			cells = np.empty((rows, size + 1), np.uint8)
+			pick = np.searchsorted(shares, rnd.random_sample((rows, size)), side="right")
+			cells[:, :-1] = codes[np.minimum(pick, len(codes) - 1)]
+			cells[:, :-1][rnd.random_sample((rows, size)) < density] = ord("#")
+			cells[:, -1] = ord("\n")
+			#the corners are kept free, so the start and goal are not walled in
+			if first == 0:
+				cells[:2, :2] = codes[0]
+				cells[0, 0] = ord("A")
+			if first + rows == size:
+				cells[-2:, size - 2:size] = codes[0]
+				cells[-1, size - 1] = ord("B")
+			f.write(cells.tobytes())
+
+
+def get_corpus(directory, kinds, sizes, seed=0):
+	#return (kind, size, filename) of every board of the corpus, the missing
+	#ones are generated
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	corpus = []
+	for size in sizes:
+		for kind in kinds:
+			filename = corpus_filename(directory, kind, size, seed)
+			if not os.path.exists(filename):
+				generate_board(filename, kind, size, seed)
+			corpus.append((kind, size, filename))
+	return corpus
+
+
+def prepare(board, algorithm):
+	#Build (or load) the precomputed data of a mode, return the seconds it took
+	begin = timer()
+	if algorithm == "hpa":
+		board.get_hierarchical()
+	elif algorithm == "alt":
+		board.get_landmarks().get_bounds(board.grid.goal)
+	return timer() - begin
+
+
+def measure(board, algorithm, repeat=3, memory=True):
+	#Run one mode on a board and return its metrics. The first run is not
+	#timed, it warms up the caches of the process and traces the memory.
+	result = {"build_seconds": round(prepare(board, algorithm), 6), "memory": None}
+	#(the distance field is computed by every query, not kept from the last one)
+	board.fields.clear()
+	if memory and tracemalloc is not None:
+		tracemalloc.start()
+		try:
+			find_path(board, algorithm=algorithm)
+			result["memory"] = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+	else:
+		find_path(board, algorithm=algorithm)
+	best = None
+	for i in range(repeat):
+		board.fields.clear()
+		begin = timer()
+		found = find_path(board, algorithm=algorithm)
+		seconds = timer() - begin
+		best = seconds if best is None else min(best, seconds)
+	result.update(cost=found["cost"], length=len(found["path"]), expanded=found["expanded"],
+		peak=found["peak"], seconds=round(best, 6))
+	return result
+
+
+def run_suite(corpus, algorithms, seed=0, repeat=3, memory=True, out=sys.stdout):
+	#Run every mode on every board of the corpus, print a line per run and
+	#return the results
+	runs = []
+	for (kind, size, filename) in corpus:
+		board = Board(filename)
+		for algorithm in algorithms:
+			if algorithm == "jps" and not board.grid.is_uniform():
+				continue
+			run = {"map": kind, "size": size, "seed": seed, "algorithm": algorithm}
+			run.update(measure(board, algorithm, repeat, memory))
+			runs.append(run)
+			out.write("%-8s %5d %-14s cost %7s expanded %9d peak %8s %9.4f s %10s bytes\n" % (kind, size, algorithm,
+				run["cost"], run["expanded"], run["peak"], run["seconds"], run["memory"]))
+			out.flush()
+	return {"python": platform.python_version(), "machine": platform.platform(), "runs": runs}
+
+
+def get_key(run):
+	return "%s-%d-%d/%s" % (run["map"], run["size"], run["seed"], run["algorithm"])
+
+
+def compare(runs, baseline, threshold=THRESHOLD, time_threshold=TIME_THRESHOLD):
+	#return a message for every run that is worse than the same run of the
+	#baseline, runs that are not in the baseline are not compared
+	old_runs = dict((get_key(run), run) for run in baseline["runs"])
+	regressions = []
+	for run in runs:
+		old = old_runs.get(get_key(run))
+		if old is None:
+			continue
+		if run["cost"] != old["cost"]:
+			regressions.append("%s: cost %s, baseline %s" % (get_key(run), run["cost"], old["cost"]))
+		for (metric, floor) in METRICS:
+			new, previous = run.get(metric), old.get(metric)
+			if new is None or previous is None:
+				continue
+			if new > (time_threshold if metric == "seconds" else threshold) * max(previous, floor):
+				regressions.append("%s: %s %s, baseline %s" % (get_key(run), metric, new, previous))
+	return regressions
+
+
+def get_list(text, choices, convert=str):
+	values = [convert(value) for value in text.split(",") if value]
+	for value in values:
+		if value not in choices:
+			raise argparse.ArgumentTypeError("%r is not one of %s" % (value, ", ".join(str(c) for c in choices)))
+	return values
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Scaling benchmark of the search modes on generated boards")
+	parser.add_argument("--sizes", type=lambda text: get_list(text, SIZES, int), default=DEFAULT_SIZES)
+	parser.add_argument("--maps", type=lambda text: get_list(text, sorted(MAPS)), default=sorted(MAPS))
+	parser.add_argument("--algorithms", type=lambda text: get_list(text, ALGORITHMS), default=ALGORITHMS)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--repeat", type=int, default=3, help="runs per mode, the best time is kept")
+	parser.add_argument("--corpus", default=CORPUS_DIR, help="directory of the generated boards")
+	parser.add_argument("--no-memory", action="store_true", help="skip the traced memory run")
+	parser.add_argument("--out", help="write the results as JSON to this file")
+	parser.add_argument("--baseline", help="JSON results to compare against")
+	parser.add_argument("--update-baseline", action="store_true", help="write the results to the baseline instead")
+	parser.add_argument("--threshold", type=float, default=THRESHOLD, help="for nodes, open set and memory")
+	parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+	args = parser.parse_args()
+	corpus = get_corpus(args.corpus, args.maps, args.sizes, args.seed)
+	results = run_suite(corpus, args.algorithms, args.seed, args.repeat, not args.no_memory)
+	outputs = [args.out] if args.out else []
+	if args.baseline and args.update_baseline:
+		outputs.append(args.baseline)
+	for filename in outputs:
+		with open(filename, "w") as f:
+			json.dump(results, f, indent=1, sort_keys=True)
+			f.write("\n")
+	if args.baseline and not args.update_baseline:
+		with open(args.baseline) as f:
+			regressions = compare(results["runs"], json.load(f), args.threshold, args.time_threshold)
+		for message in regressions:
+			print("REGRESSION " + message)
+		if regressions:
+			sys.exit(1)
+		print("no regressions against %s" % args.baseline)
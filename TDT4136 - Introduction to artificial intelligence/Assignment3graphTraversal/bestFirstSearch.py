@@ -0,0 +1,119 @@
+#A*, Dijkstra and BFS on the astarPart2 cost model (a move costs the value
+#of the cell that is entered), the one best-first search loop of the scripts
+#and of pathfinding.py. The open set is an indexed heap, or a FIFO queue for
+#BFS, with an open/closed state flag for every node: a node reached again on
+#a cheaper path has its key lowered in place, and closed nodes are skipped.
+#The heuristic is min cost * manhattan distance to the goal for A*, or a
+#table of lower bounds for every node (the ALT landmarks, see landmarks.py).
+#The search keeps its counters in a SearchStats and reports its events to an
+#optional SearchHook, see instrument.py.
+
+import numpy as np
+
+from indexedHeap import CLOSED, IndexedHeap, IndexedQueue
+from instrument import SearchStats, count_open_set
+
+
+class BestFirstSearch():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#bounds - heuristic of every node as an array (ALT), or None
+	#heuristic - False for Dijkstra and BFS
+	#fifo - True for BFS
+	#opened - the open set of the last search, with the state flag of every node
+	#g - cost from the start of each reached node
+	#parent - the node each node was reached from
+	#expanded - the number of nodes expanded
+	#stats - counters and phase timers of the last search, see instrument.py
+	#hook - optional SearchHook told about the opened and expanded nodes, None for no events
+	def __init__(self, grid, start=None, goal=None, heuristic=True, fifo=False, bounds=None, hook=None):
+		self.grid = grid
+		self.start = grid.start if start is None else start
+		self.goal = grid.goal if goal is None else goal
+		self.heuristic = heuristic
+		self.fifo = fifo
+		self.bounds = bounds
+		self.hook = hook
+		self.min_cost = grid.get_min_cost()
+		self.opened = None
+		self.g = {}
+		self.parent = {}
+		self.expanded = 0
+		self.stats = SearchStats()
+
+	def get_heuristic(self, node):
+		if self.bounds is not None:
+			return int(self.bounds[node])
+		if not self.heuristic:
+			return 0
+		return self.min_cost * self.grid.get_heuristic(node, self.goal)
+
+	def process(self):
+		grid = self.grid
+		costs = grid.costs
+		stats = self.stats = SearchStats()
+		hook = self.hook
+		if hook is not None:
+			hook.begin(grid)
+		opened = IndexedQueue(len(grid)) if self.fifo else IndexedHeap(len(grid))
+		self.opened = opened
+		g = self.g = {self.start: 0}
+		parent = self.parent = {}
+		#pushes and expansions are read from the state flags afterwards,
+		#only the decrease-keys are counted in the loop
+		decreased = 0
+		found = False
+		with stats.phase("search"):
+			opened.push(self.start, self.get_heuristic(self.start))
+			if hook is not None:
+				hook.push(self.start)
+			while len(opened):
+				node = opened.pop()
+				if hook is not None:
+					hook.expand(node)
+				if node == self.goal:
+					found = True
+					break
+				for adj in grid.get_neighbours(node):
+					if opened.is_closed(adj):
+						continue
+					new = g[node] + int(costs[adj])
+					if adj in opened:
+						if new < g[adj]:
+							g[adj] = new
+							parent[adj] = node
+							decreased += 1
+							opened.decrease_key(adj, new + self.get_heuristic(adj))
+					else:
+						g[adj] = new
+						parent[adj] = node
+						opened.push(adj, new + self.get_heuristic(adj))
+						if hook is not None:
+							hook.push(adj)
+		count_open_set(stats, opened)
+		stats.decrease_keys = decreased
+		self.expanded = stats.expansions
+		if hook is not None:
+			hook.done(self.get_path())
+		return found
+
+	def get_path(self):
+		#return the nodes of the path from the start to the goal, [] if there is none
+		if self.goal not in self.g:
+			return []
+		path = [self.goal]
+		while path[-1] != self.start:
+			path.append(self.parent[path[-1]])
+		path.reverse()
+		return path
+
+	def get_closed(self):
+		#return the set of expanded nodes, read from the state flags
+		if self.opened is None:
+			return set()
+		return set(np.flatnonzero(np.frombuffer(self.opened.pos, np.int32) == CLOSED).tolist())
+
+	def get_opened(self):
+		if self.opened is None:
+			return []
+		return self.opened.nodes()
@@ -0,0 +1,137 @@
+
+#Bidirectional Dijkstra and bidirectional A* on the astarPart2 cost model.
+#One search runs forward from the start, the other backward from the goal
+#over the reversed moves (entering cell v still costs the value of v, so the
+#backward search pays the value of the cell it comes from). Whenever a node
+#has been reached by both searches, the path through it is a candidate and
+#the best one is kept in mu. The searches stop when no unexpanded node can
+#lie on a cheaper path, i.e. when the two smallest keys add up to at least mu.
+#Bidirectional Dijkstra uses g as key. Bidirectional A* uses the average of
+#the two heuristics (min cost * manhattan distance to the goal and from the
+#start) as potential, p(v) = (h_goal(v) - h_start(v)) / 2, with key g + p(v)
+#forward and g - p(v) backward. The potentials add up to 0, so the stopping
+#criterion stays the same, and the next node is always taken from the
+#direction with the smaller key, so the two searches meet in the middle.
+#(Keys are kept doubled to stay integers.)
+
+import numpy as np
+
+from indexedHeap import CLOSED, IndexedHeap
+
+
+class BidirectionalSearch():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#heuristic - True for bidirectional A*, False for bidirectional Dijkstra
+	#opened - the forward and backward open sets
+	#g - cost from the start (forward) / to the goal (backward) of each reached node
+	#parent - the node each node was reached from, in each direction
+	#cost - cost of the best path found (mu), None if there is none
+	#meeting - the node where the best forward and backward paths meet
+	#expanded - nodes expanded by the forward and backward searches
+	def __init__(self, grid, start=None, goal=None, heuristic=True):
+		self.grid = grid
+		self.start = grid.start if start is None else start
+		self.goal = grid.goal if goal is None else goal
+		self.heuristic = heuristic
+		self.min_cost = grid.get_min_cost()
+		self.opened = None
+		self.g = ({}, {})
+		self.parent = ({}, {})
+		self.cost = None
+		self.meeting = None
+		self.expanded = [0, 0]
+
+	def get_heuristic(self, node, direction):
+		#return the doubled potential of a node for one direction
+		if not self.heuristic:
+			return 0
+		grid = self.grid
+		potential = self.min_cost * (grid.get_heuristic(node, self.goal) - grid.get_heuristic(node, self.start))
+		return potential if direction == 0 else -potential
+
+	def get_top(self, direction):
+		#the smallest key of a direction, None if its open set is empty
+		opened = self.opened[direction]
+		return opened.keys[opened.heap[0]] if len(opened) else None
+
+	def is_done(self):
+		#the stopping criterion, see the top of the file
+		tops = [self.get_top(0), self.get_top(1)]
+		if None in tops:
+			return True
+		if self.cost is None:
+			return False
+		return tops[0] + tops[1] >= 2 * self.cost
+
+	def expand(self, direction):
+		#Expand the best node of one direction
+		costs = self.grid.costs
+		opened = self.opened[direction]
+		g = self.g[direction]
+		parent = self.parent[direction]
+		other = self.g[1 - direction]
+		node = opened.pop()
+		self.expanded[direction] += 1
+		for adj in self.grid.get_neighbours(node):
+			if opened.is_closed(adj):
+				continue
+			#forward pays for entering adj, backward for entering node from adj
+			new = g[node] + int(costs[adj] if direction == 0 else costs[node])
+			if adj in opened:
+				if new >= g[adj]:
+					continue
+				g[adj] = new
+				parent[adj] = node
+				opened.decrease_key(adj, 2 * new + self.get_heuristic(adj, direction))
+			else:
+				g[adj] = new
+				parent[adj] = node
+				opened.push(adj, 2 * new + self.get_heuristic(adj, direction))
+			if adj in other and (self.cost is None or new + other[adj] < self.cost):
+				self.cost = new + other[adj]
+				self.meeting = adj
+
+	def process(self):
+		#Run both searches, always expanding the direction with the smaller top key
+		size = len(self.grid)
+		self.opened = (IndexedHeap(size), IndexedHeap(size))
+		self.g = ({self.start: 0}, {self.goal: 0})
+		self.parent = ({}, {})
+		self.expanded = [0, 0]
+		self.cost = None
+		self.meeting = None
+		if self.start == self.goal:
+			self.cost = 0
+			self.meeting = self.start
+			return True
+		self.opened[0].push(self.start, self.get_heuristic(self.start, 0))
+		self.opened[1].push(self.goal, self.get_heuristic(self.goal, 1))
+		while not self.is_done():
+			if self.get_top(0) <= self.get_top(1):
+				self.expand(0)
+			else:
+				self.expand(1)
+		return self.cost is not None
+
+	def get_path(self):
+		#return the path from start to goal through the meeting node
+		if self.meeting is None:
+			return []
+		path = [self.meeting]
+		while path[-1] != self.start:
+			path.append(self.parent[0][path[-1]])
+		path.reverse()
+		while path[-1] != self.goal:
+			path.append(self.parent[1][path[-1]])
+		return path
+
+	def get_closed(self):
+		#return the nodes expanded in either direction, read from the state flags
+		closed = set()
+		for opened in self.opened:
+			closed.update(np.flatnonzero(np.frombuffer(opened.pos, np.int32) == CLOSED).tolist())
+		return closed
+
+	def get_opened(self):
+		return self.opened[0].nodes() + self.opened[1].nodes()
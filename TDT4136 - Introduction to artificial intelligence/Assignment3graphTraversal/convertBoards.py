@@ -0,0 +1,31 @@
+
+#Convert txt-boards to the binary board format of grid.py (board-2-1.txt ->
+#board-2-1.brd next to it). The binary boards are memory mapped by
+#load_board instead of parsed, so large boards open in milliseconds.
+#Usage: python convertBoards.py [board.txt ...]   (default is boards/*.txt)
+
+import glob
+import sys
+import time
+
+from grid import binary_filename, load_board, save_binary
+
+
+def convert(filename):
+	#Convert one board, return the name of the binary board
+	target = binary_filename(filename)
+	save_binary(load_board(filename), target)
+	return target
+
+
+if __name__ == "__main__":
+	filenames = sys.argv[1:] or sorted(glob.glob("boards/*.txt"))
+	for filename in filenames:
+		target = convert(filename)
+		begin = time.time()
+		load_board(filename)
+		text_seconds = time.time() - begin
+		begin = time.time()
+		load_board(target)
+		binary_seconds = time.time() - begin
+		print("%s -> %s (load %.4f s -> %.4f s)" % (filename, target, text_seconds, binary_seconds))
@@ -0,0 +1,150 @@
+
+#D* Lite: incremental replanning when the costs of the board change.
+#The search runs backward from the goal on the cost model of astarPart2 (a
+#move costs the value of the cell that is entered, 0 blocks the cell):
+# g(s)   - the cost from s to the goal found by the last search
+# rhs(s) - the one step lookahead min over neighbours s' of cost(s') + g(s')
+#A cell is consistent when g == rhs. A change of cell costs only makes the
+#cells next to the changed ones inconsistent, and the next search only
+#expands inconsistent cells whose key is below the key of the start, so a
+#repair touches the part of the board that the change affects instead of
+#searching again from scratch. Keys are (min(g, rhs) + h(start, s) + km,
+#min(g, rhs)) with the consistent heuristic MIN_COST * manhattan distance,
+#km collects the heuristic change when the start moves. (The cheapest cell
+#of the board can not be used as the scale: a cost update can make a cell
+#cheaper than that, after which the heuristic would overestimate.)
+#See Koenig and Likhachev, "D* Lite" (AAAI 2002).
+
+from grid import MIN_COST
+from indexedHeap import IndexedHeap
+
+INF = float("inf")
+
+
+class DStarLite():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py. Cost updates are written into grid.costs
+	#start - The current node of the agent
+	#goal - The ending node
+	#g, rhs - cost estimates of every node, see above
+	#opened - indexed heap of the inconsistent nodes, keyed by (k1, k2)
+	#km - the key modifier, the sum of the heuristic changes of the start
+	#expanded - nodes expanded by the last call of process
+	def __init__(self, grid, start=None, goal=None):
+		self.grid = grid
+		self.start = grid.start if start is None else start
+		self.goal = grid.goal if goal is None else goal
+		self.g = [INF] * len(grid)
+		self.rhs = [INF] * len(grid)
+		self.rhs[self.goal] = 0
+		self.km = 0
+		self.expanded = 0
+		self.opened = IndexedHeap(len(grid))
+		self.opened.push(self.goal, self.calculate_key(self.goal))
+
+	def get_heuristic(self, node):
+		#lower bound on the cost between the start and node
+		return MIN_COST * self.grid.get_heuristic(self.start, node)
+
+	def calculate_key(self, node):
+		best = min(self.g[node], self.rhs[node])
+		return (best + self.get_heuristic(node) + self.km, best)
+
+	def get_lookahead(self, node):
+		#return the rhs value of a node from the g values of its neighbours
+		if node == self.goal:
+			return 0
+		if not self.grid.costs[node]:
+			return INF
+		costs = self.grid.costs
+		g = self.g
+		best = INF
+		for adj in self.grid.get_neighbours(node):
+			value = int(costs[adj]) + g[adj]
+			if value < best:
+				best = value
+		return best
+
+	def update_vertex(self, node):
+		#Recompute rhs of a node and put it in (or take it out of) the open set
+		opened = self.opened
+		self.rhs[node] = self.get_lookahead(node)
+		if self.g[node] != self.rhs[node]:
+			if node in opened:
+				opened.update(node, self.calculate_key(node))
+			else:
+				opened.push(node, self.calculate_key(node))
+		elif node in opened:
+			opened.remove(node)
+
+	def process(self):
+		#Compute (or repair) the shortest path from the start, return True if there is one
+		opened = self.opened
+		g = self.g
+		rhs = self.rhs
+		self.expanded = 0
+		while len(opened) and (opened.top_key() < self.calculate_key(self.start) or rhs[self.start] != g[self.start]):
+			node = opened.heap[0]
+			old = opened.top_key()
+			new = self.calculate_key(node)
+			if old < new:
+				#the key is out of date since the start moved
+				opened.update(node, new)
+				continue
+			opened.pop()
+			self.expanded += 1
+			if g[node] > rhs[node]:
+				#overconsistent, the cost of the node went down
+				g[node] = rhs[node]
+				for adj in self.grid.get_neighbours(node):
+					self.update_vertex(adj)
+			else:
+				#underconsistent, the cost of the node went up
+				g[node] = INF
+				for adj in self.grid.get_neighbours(node) + [node]:
+					self.update_vertex(adj)
+		return g[self.start] != INF
+
+	def update_costs(self, changes):
+		#Apply a batch of (node, cost) changes to the board, the path is
+		#repaired by the next call of process. Entering a node got cheaper or
+		#more expensive, so the rhs of its neighbours (and its own, if it was
+		#blocked or unblocked) may change.
+		costs = self.grid.costs
+		touched = set()
+		for (node, cost) in changes:
+			if costs[node] == cost:
+				continue
+			costs[node] = cost
+			touched.add(node)
+			touched.update(self.grid.get_neighbours(node))
+		for node in touched:
+			self.update_vertex(node)
+		return len(touched)
+
+	def move_to(self, node):
+		#Move the start of the agent, the open set is kept by raising km
+		self.km += self.get_heuristic(node)
+		self.start = node
+
+	def get_path(self):
+		#return the path from the start to the goal, following the cheapest
+		#neighbour of every node, [] if there is none. The g values have to
+		#be consistent (process was run after the last update), otherwise the
+		#walk can go in circles or get stuck and a RuntimeError is raised
+		if self.g[self.start] == INF:
+			return []
+		costs = self.grid.costs
+		g = self.g
+		path = [self.start]
+		while path[-1] != self.goal:
+			adjs = self.grid.get_neighbours(path[-1])
+			if not adjs or len(path) > len(self.grid):
+				raise RuntimeError("the path from the start does not reach the goal, run process after update_costs")
+			path.append(min(adjs, key=lambda adj: int(costs[adj]) + g[adj]))
+		return path
+
+	def get_cost(self):
+		#return the cost of the current path, None if there is none
+		cost = self.g[self.start]
+		return None if cost == INF else int(cost)
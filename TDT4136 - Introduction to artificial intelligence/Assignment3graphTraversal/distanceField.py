@@ -0,0 +1,97 @@
+
+#Goal rooted distance fields for many queries to the same goal.
+#A field is one reverse Dijkstra from the goal over the whole board, on the
+#cost model of astarPart2: dist is the cost of the cheapest path from every
+#cell to the goal and step the next cell on that path. After that, the
+#optimal path of any start is read by following step, in O(path length)
+#and without any search.
+#Fields are kept in a least recently used cache keyed by (board hash, goal),
+#which is bounded by the memory of the arrays it holds.
+
+from collections import OrderedDict
+
+from grid import board_hash
+from landmarks import UNREACHED, dijkstra
+
+#memory bound of the default cache, in bytes (a 1000x1000 board takes 8 MB per field)
+CACHE_BYTES = 64 * 1024 * 1024
+
+
+class DistanceField():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#goal - the goal node the field is rooted at
+	#dist - int32 array, cost from each node to the goal, UNREACHED if there is no path
+	#step - int32 array, the next node on the way to the goal, -1 if none
+	def __init__(self, grid, goal):
+		self.grid = grid
+		self.goal = goal
+		self.dist, self.step = dijkstra(grid, goal, reverse=True)
+
+	@property
+	def nbytes(self):
+		#the memory used by the field, in bytes
+		return self.dist.nbytes + self.step.nbytes
+
+	def get_cost(self, start):
+		#return the cost of the optimal path from start, None if there is none
+		cost = int(self.dist[start])
+		return None if cost == UNREACHED else cost
+
+	def get_path(self, start):
+		#return the optimal path from start to the goal, [] if there is none
+		if self.dist[start] == UNREACHED:
+			return []
+		step = self.step
+		path = [start]
+		while path[-1] != self.goal:
+			path.append(int(step[path[-1]]))
+		return path
+
+
+class FieldCache():
+	#LRU cache of distance fields with parameters:
+	#max_bytes - the memory bound of the fields kept
+	#fields - (board hash, goal) -> DistanceField, least recently used first
+	#size - the memory used by the fields kept, in bytes
+	#hits, misses - number of lookups that found / computed their field
+	def __init__(self, max_bytes=CACHE_BYTES):
+		self.max_bytes = max_bytes
+		self.fields = OrderedDict()
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.fields)
+
+	def get_field(self, grid, goal, boardhash=None):
+		#return the field of a goal, computed on a miss. The board hash can be
+		#passed in when the caller already has it, to skip hashing the board.
+		key = (board_hash(grid) if boardhash is None else boardhash, goal)
+		field = self.fields.pop(key, None)
+		if field is not None:
+			self.hits += 1
+		else:
+			self.misses += 1
+			field = DistanceField(grid, goal)
+			self.size += field.nbytes
+		self.fields[key] = field
+		#evict the least recently used fields, but always keep the newest one
+		while self.size > self.max_bytes and len(self.fields) > 1:
+			key, old = self.fields.popitem(last=False)
+			self.size -= old.nbytes
+		return field
+
+	def clear(self):
+		self.fields.clear()
+		self.size = 0
+
+
+#the cache shared by the callers of get_field
+FIELDS = FieldCache()
+
+
+def get_field(grid, goal, boardhash=None):
+	#return the distance field of a goal from the shared cache
+	return FIELDS.get_field(grid, goal, boardhash)
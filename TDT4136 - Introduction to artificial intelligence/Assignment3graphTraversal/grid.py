@@ -0,0 +1,194 @@
+
+#Compact array representation of the boards.
+#A board is stored as one flat uint8 cost layer, a cell (x,y) is the plain
+#integer node x * grid_height + y. The cost of a node is the cost of moving
+#into that cell, 0 means the cell cannot be entered.
+#Boards are read from the txt-boards, or from the binary format below which
+#is memory mapped instead of parsed.
+
+import hashlib
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+BLOCKED = 0
+
+#Cost of entering a cell for each board character, both for the uniform
+#boards (board-1-*: '.', '#') and the weighted boards (board-2-*).
+TERRAIN_COSTS = {
+	'.': 1,
+	'#': BLOCKED,
+	'A': 1,
+	'B': 1,
+	'r': 1,
+	'g': 5,
+	'f': 10,
+	'm': 50,
+	'w': 100,
+}
+
+#The cheapest cost a reachable cell can have, on any board and after any
+#change of its costs
+MIN_COST = min(cost for cost in TERRAIN_COSTS.values() if cost != BLOCKED)
+
+#Lookup table from character code to cost, 255 marks unknown characters
+DECODE = np.full(256, 255, np.uint8)
+for ch, cost in TERRAIN_COSTS.items():
+	DECODE[ord(ch)] = cost
+
+#Binary boards (.brd): a little endian header with a magic string, the width,
+#the height and the start and goal nodes (-1 if there is none), followed by
+#the uint8 cost of every node in node order
+BINARY_SUFFIX = ".brd"
+BINARY_MAGIC = b"BRD1"
+BINARY_HEADER = struct.Struct("<4siiii")
+
+
+class Grid():
+	#A decoded board with parameters:
+	#costs - flat uint8 array with the cost of entering every node
+	#grid_width - the number of rows (x coordinates) of the board
+	#grid_height - the number of columns (y coordinates) of the board
+	#start - the node of 'A'
+	#goal - the node of 'B'
+	def __init__(self, costs, grid_width, grid_height, start, goal):
+		self.costs = costs
+		self.grid_width = grid_width
+		self.grid_height = grid_height
+		self.start = start
+		self.goal = goal
+
+	def __len__(self):
+		return self.grid_width * self.grid_height
+
+	def get_index(self, x, y):
+		#return the node of a given coordinate
+		return x * self.grid_height + y
+
+	def get_coords(self, node):
+		#return the (x,y) coordinate of a node
+		return divmod(node, self.grid_height)
+
+	def is_reachable(self, node):
+		return self.costs[node] != BLOCKED
+
+	def is_uniform(self):
+		#True if every reachable cell has the same cost
+		reachable = self.costs[self.costs != BLOCKED]
+		return len(reachable) == 0 or bool((reachable == reachable[0]).all())
+
+	def get_min_cost(self):
+		#return the cost of the cheapest reachable cell (1 if there is none),
+		#min cost * manhattan distance is a lower bound on the cost between two nodes
+		reachable = self.costs[self.costs != BLOCKED]
+		return int(reachable.min()) if len(reachable) else 1
+
+	def get_neighbours(self, node):
+		#return list of reachable neighbouring nodes clockwise starting
+		#from the rightmost one
+		height = self.grid_height
+		costs = self.costs
+		x, y = divmod(node, height)
+		nodes = []
+		if x < self.grid_width-1 and costs[node+height]:
+			nodes.append(node+height)
+		if y > 0 and costs[node-1]:
+			nodes.append(node-1)
+		if x > 0 and costs[node-height]:
+			nodes.append(node-height)
+		if y < height-1 and costs[node+1]:
+			nodes.append(node+1)
+		return nodes
+
+	def get_heuristic(self, node, goal):
+		#return the manhattan distance between two nodes
+		x, y = divmod(node, self.grid_height)
+		gx, gy = divmod(goal, self.grid_height)
+		return abs(x - gx) + abs(y - gy)
+
+
+def board_hash(grid):
+	#content hash of a board, used to detect stale precomputed files
+	digest = hashlib.sha1(("%d %d " % (grid.grid_width, grid.grid_height)).encode("ascii"))
+	digest.update(grid.costs.tobytes())
+	return digest.hexdigest()
+
+
+def decode_board(lines):
+	#Decode the lines of a txt-board into a Grid
+	grid_width = len(lines)
+	grid_height = len(lines[0])
+	if any(len(line) != grid_height for line in lines):
+		raise ValueError("board rows must all have the same length")
+	chars = np.frombuffer("".join(lines).encode("ascii"), np.uint8)
+	costs = DECODE[chars]
+	if (costs == 255).any():
+		bad = chr(chars[np.argmax(costs == 255)])
+		raise ValueError("unknown board character %r" % bad)
+	start = np.flatnonzero(chars == ord('A'))
+	goal = np.flatnonzero(chars == ord('B'))
+	start = int(start[0]) if len(start) else None
+	goal = int(goal[0]) if len(goal) else None
+	return Grid(costs, grid_width, grid_height, start, goal)
+
+
+def atomic_save(filename, writer):
+	#Write a file with writer(f) on a binary file object, through a temporary
+	#file in the same directory that is renamed to filename when it is
+	#complete, so another process never reads (or maps) a half written file
+	fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=os.path.splitext(filename)[1])
+	try:
+		with os.fdopen(fd, "wb") as f:
+			writer(f)
+		os.rename(tmp, filename)
+	except BaseException:
+		os.remove(tmp)
+		raise
+
+
+def save_binary(grid, filename):
+	#Write a board in the binary format
+	start = -1 if grid.start is None else grid.start
+	goal = -1 if grid.goal is None else grid.goal
+
+	def writer(f):
+		f.write(BINARY_HEADER.pack(BINARY_MAGIC, grid.grid_width, grid.grid_height, start, goal))
+		f.write(np.ascontiguousarray(grid.costs, np.uint8).tobytes())
+	atomic_save(filename, writer)
+
+
+def load_binary(filename):
+	#Map a binary board. The costs are a copy-on-write view of the file: no
+	#copy is made and the pages are shared with every process that maps the
+	#same board, a write only changes the private copy of that page.
+	with open(filename, "rb") as f:
+		header = f.read(BINARY_HEADER.size)
+	if len(header) < BINARY_HEADER.size:
+		raise ValueError("%s is not a binary board" % filename)
+	magic, grid_width, grid_height, start, goal = BINARY_HEADER.unpack(header)
+	if magic != BINARY_MAGIC:
+		raise ValueError("%s is not a binary board" % filename)
+	size = grid_width * grid_height
+	if os.path.getsize(filename) != BINARY_HEADER.size + size:
+		raise ValueError("%s is truncated" % filename)
+	if size == 0:
+		costs = np.zeros(0, np.uint8)
+	else:
+		costs = np.memmap(filename, np.uint8, "c", BINARY_HEADER.size, (size,))
+	return Grid(costs, grid_width, grid_height, None if start < 0 else start, None if goal < 0 else goal)
+
+
+def binary_filename(filename):
+	#the binary board of boards/board-2-1.txt is boards/board-2-1.brd
+	return os.path.splitext(filename)[0] + BINARY_SUFFIX
+
+
+def load_board(filename):
+	#Read a txt-board ('A' start, 'B' goal, '#' obstacle, 'rgfmw' terrain),
+	#or map a binary board
+	if filename.endswith(BINARY_SUFFIX):
+		return load_binary(filename)
+	with open(filename) as f:
+		return decode_board([line for line in f.read().splitlines() if line])
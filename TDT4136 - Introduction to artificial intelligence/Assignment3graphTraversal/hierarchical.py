@@ -0,0 +1,262 @@
+
+#Hierarchical path-finding A* (HPA*) for large weighted boards.
+#The board is split into square clusters. Where two neighbouring clusters
+#share a run of open border cells with the same terrain on each side, the
+#run becomes an entrance: a pair of cells, one on each side, that are nodes
+#of a small abstract graph. Splitting entrances where the terrain changes
+#keeps the paths close to optimal on the weighted boards. Inside
+#every cluster the costs between its entrance nodes are precomputed with
+#Dijkstra, using the cost model of astarPart2 (a move costs the value of the
+#cell that is entered). A query connects start and goal to the entrances of
+#their clusters, searches the abstract graph and only refines the abstract
+#path into single cells when the path is read.
+#The abstract graph is saved next to the board file (board-2-1.hpa.npz) and
+#reused by later runs as long as the board and the cluster size are unchanged.
+
+import heapq
+import os
+
+import numpy as np
+
+from grid import atomic_save, board_hash
+from indexedHeap import CLOSED, IndexedHeap
+
+CLUSTER_SIZE = 16
+#Entrances of at most this many cells get one transition in the middle,
+#longer entrances get one transition at each end
+ENTRANCE_WIDTH = 6
+
+
+def graph_filename(filename):
+	#the abstract graph of boards/board-2-1.txt is boards/board-2-1.hpa.npz
+	return os.path.splitext(filename)[0] + ".hpa.npz"
+
+
+class HierarchicalAStar():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#cluster_size - the side of the square clusters
+	#edges - the abstract graph, node -> list of (node, cost)
+	#opened - indexed heap of the last abstract search (over the ids below)
+	#nodes - the grid node of every id used in the last abstract search
+	#cost - the cost of the last path found, None if there is none
+	#expanded - nodes expanded by the last query, abstract search and refinement
+	def __init__(self, grid, filename=None, cluster_size=CLUSTER_SIZE):
+		self.grid = grid
+		self.cluster_size = cluster_size
+		self.min_cost = grid.get_min_cost()
+		self.edges = {}
+		self.opened = None
+		self.nodes = []
+		self.cost = None
+		self.expanded = 0
+		if filename is None:
+			self.build()
+		else:
+			self.load_or_build(graph_filename(filename))
+
+	def get_cluster(self, node):
+		#return the bounds (x0, x1, y0, y1) of the cluster of a node, x1 and y1 excluded
+		size = self.cluster_size
+		x, y = self.grid.get_coords(node)
+		x0 = x - x % size
+		y0 = y - y % size
+		return (x0, min(x0 + size, self.grid.grid_width), y0, min(y0 + size, self.grid.grid_height))
+
+	def cluster_search(self, source, bounds, goal=None, reverse=False):
+		#Dijkstra from source restricted to the cells inside bounds. Returns
+		#(dist, parent) dictionaries. With reverse, dist is the cost of going
+		#from each cell to source instead. Stops early when goal is popped.
+		grid = self.grid
+		costs = grid.costs
+		height = grid.grid_height
+		x0, x1, y0, y1 = bounds
+		dist = {source: 0}
+		parent = {}
+		closed = set()
+		heap = [(0, source)]
+		while heap:
+			d, node = heapq.heappop(heap)
+			if node in closed:
+				continue
+			closed.add(node)
+			self.expanded += 1
+			if node == goal:
+				break
+			for adj in grid.get_neighbours(node):
+				x, y = divmod(adj, height)
+				if x < x0 or x >= x1 or y < y0 or y >= y1 or adj in closed:
+					continue
+				nd = d + int(costs[node] if reverse else costs[adj])
+				if nd < dist.get(adj, nd + 1):
+					dist[adj] = nd
+					parent[adj] = node
+					heapq.heappush(heap, (nd, adj))
+		return dist, parent
+
+	def add_edge(self, edges, node, adj, cost):
+		edges.setdefault(node, []).append((adj, cost))
+
+	def get_entrances(self):
+		#return the transitions (node on one side, node on the other side)
+		#of all entrances between neighbouring clusters, an entrance ends
+		#at an obstacle or where the cost on either side changes
+		grid = self.grid
+		size = self.cluster_size
+		costs = grid.costs
+		height = grid.grid_height
+		transitions = []
+		#borders between clusters above each other (x, x+1) and next to each other (y, y+1)
+		borders = []
+		for x in range(size - 1, grid.grid_width - 1, size):
+			for y0 in range(0, height, size):
+				borders.append([(x * height + y, (x + 1) * height + y) for y in range(y0, min(y0 + size, height))])
+		for y in range(size - 1, height - 1, size):
+			for x0 in range(0, grid.grid_width, size):
+				borders.append([(x * height + y, x * height + y + 1) for x in range(x0, min(x0 + size, grid.grid_width))])
+		for border in borders:
+			run = []
+			#(the closing (None, None) ends the last run)
+			for (p, q) in border + [(None, None)]:
+				if run and (p is None or costs[p] != costs[run[-1][0]] or costs[q] != costs[run[-1][1]]):
+					if len(run) > ENTRANCE_WIDTH:
+						transitions.extend([run[0], run[-1]])
+					else:
+						transitions.append(run[len(run) // 2])
+					run = []
+				if p is not None and costs[p] != 0 and costs[q] != 0:
+					run.append((p, q))
+		return transitions
+
+	def build(self):
+		#Build the abstract graph: inter-cluster edges between the two cells
+		#of every transition and intra-cluster edges between the entrance
+		#nodes of every cluster
+		costs = self.grid.costs
+		self.edges = {}
+		clusters = {}
+		for (p, q) in self.get_entrances():
+			self.add_edge(self.edges, p, q, int(costs[q]))
+			self.add_edge(self.edges, q, p, int(costs[p]))
+			for node in (p, q):
+				nodes = clusters.setdefault(self.get_cluster(node), [])
+				if node not in nodes:
+					nodes.append(node)
+		for bounds, nodes in clusters.items():
+			for node in nodes:
+				dist, parent = self.cluster_search(node, bounds)
+				for other in nodes:
+					if other != node and other in dist:
+						self.add_edge(self.edges, node, other, dist[other])
+		self.expanded = 0
+
+	def save(self, graphfile, boardhash):
+		#Write the abstract graph as flat edge arrays, see grid.atomic_save
+		edge_from, edge_to, edge_cost = [], [], []
+		for node, adjs in self.edges.items():
+			for (adj, cost) in adjs:
+				edge_from.append(node)
+				edge_to.append(adj)
+				edge_cost.append(cost)
+		atomic_save(graphfile, lambda f: np.savez(f, board_hash=np.array(boardhash), cluster_size=np.array(self.cluster_size),
+			edge_from=np.array(edge_from, np.int64), edge_to=np.array(edge_to, np.int64),
+			edge_cost=np.array(edge_cost, np.int64)))
+
+	def load_or_build(self, graphfile):
+		#Load the abstract graph saved next to the board, or build and save it
+		boardhash = board_hash(self.grid)
+		if os.path.exists(graphfile):
+			data = np.load(graphfile)
+			if str(data["board_hash"]) == boardhash and int(data["cluster_size"]) == self.cluster_size:
+				self.edges = {}
+				for (node, adj, cost) in zip(data["edge_from"].tolist(), data["edge_to"].tolist(), data["edge_cost"].tolist()):
+					self.add_edge(self.edges, node, adj, cost)
+				return
+		self.build()
+		self.save(graphfile, boardhash)
+
+	def search(self, start, goal):
+		#Search the abstract graph with start and goal connected to the
+		#entrance nodes of their clusters. Returns the abstract path.
+		self.expanded = 0
+		self.cost = None
+		overlay = {}
+		bounds = self.get_cluster(start)
+		dist, parent = self.cluster_search(start, bounds)
+		for node in dist:
+			if node != start and (node in self.edges or node == goal):
+				self.add_edge(overlay, start, node, dist[node])
+		dist, parent = self.cluster_search(goal, self.get_cluster(goal), reverse=True)
+		for node in dist:
+			if node != goal and node in self.edges:
+				self.add_edge(overlay, node, goal, dist[node])
+		#A* over the abstract graph, with dense ids for the indexed heap
+		ids = {}
+		self.nodes = []
+		for node in [start, goal] + list(self.edges):
+			if node not in ids:
+				ids[node] = len(self.nodes)
+				self.nodes.append(node)
+		self.opened = IndexedHeap(len(self.nodes))
+		g = {start: 0}
+		came_from = {}
+		self.opened.push(ids[start], self.min_cost * self.grid.get_heuristic(start, goal))
+		while len(self.opened):
+			node = self.nodes[self.opened.pop()]
+			self.expanded += 1
+			if node == goal:
+				self.cost = g[goal]
+				path = [goal]
+				while path[-1] != start:
+					path.append(came_from[path[-1]])
+				path.reverse()
+				return path
+			for (adj, cost) in self.edges.get(node, []) + overlay.get(node, []):
+				i = ids[adj]
+				if self.opened.is_closed(i):
+					continue
+				new = g[node] + cost
+				f = new + self.min_cost * self.grid.get_heuristic(adj, goal)
+				if i in self.opened:
+					if new < g[adj]:
+						g[adj] = new
+						came_from[adj] = node
+						self.opened.decrease_key(i, f)
+				else:
+					g[adj] = new
+					came_from[adj] = node
+					self.opened.push(i, f)
+		return []
+
+	def refine(self, path):
+		#Lazily turn an abstract path into single cells, one abstract edge at a time
+		if not path:
+			return
+		yield path[0]
+		for node, adj in zip(path, path[1:]):
+			bounds = self.get_cluster(node)
+			if bounds != self.get_cluster(adj):
+				#inter-cluster edge, the two cells are neighbours
+				yield adj
+				continue
+			dist, parent = self.cluster_search(node, bounds, goal=adj)
+			cells = [adj]
+			while cells[-1] != node:
+				cells.append(parent[cells[-1]])
+			for cell in reversed(cells[:-1]):
+				yield cell
+
+	def get_path(self, start=None, goal=None):
+		#return an iterator over the cells of the path from start to goal,
+		#the path is refined as it is read
+		start = self.grid.start if start is None else start
+		goal = self.grid.goal if goal is None else goal
+		return self.refine(self.search(start, goal))
+
+	def get_closed(self):
+		#return the grid nodes that were expanded in the abstract search
+		closed = np.flatnonzero(np.frombuffer(self.opened.pos, np.int32) == CLOSED)
+		return set(self.nodes[i] for i in closed.tolist())
+
+	def get_opened(self):
+		return [self.nodes[i] for i in self.opened.nodes()]
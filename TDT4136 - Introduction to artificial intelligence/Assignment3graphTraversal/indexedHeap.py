@@ -0,0 +1,162 @@
+
+#Open sets for the graph traversal algorithms.
+#Nodes are integer indices in the range [0, size), i.e. x * grid_height + y.
+#The position of every node in the queue is kept in pos, which doubles
+#as the per-node state flag:
+# pos[node] >= 0       - the node is opened (and sits at heap[pos[node]])
+# pos[node] == UNSEEN  - the node has never been opened
+# pos[node] == CLOSED  - the node has been popped, i.e. it is closed/visited
+#This gives O(1) membership tests instead of a linear scan of the heap.
+#pos is a compact int array (4 bytes per node), keys are only kept for the
+#nodes that are currently opened.
+
+from array import array
+from collections import deque
+
+UNSEEN = -1
+CLOSED = -2
+
+
+class IndexedHeap():
+	#Binary min-heap with decrease-key, parameters:
+	#heap - the opened nodes in heap order
+	#keys - the priority (f value) of each opened node, keyed by node
+	#pos - heap slot or state flag of each node, indexed by node
+	#peak - the largest number of nodes that were opened at the same time
+	def __init__(self, size):
+		self.heap = []
+		self.keys = {}
+		self.pos = array("i", [UNSEEN]) * size
+		self.peak = 0
+
+	def __len__(self):
+		return len(self.heap)
+
+	def __contains__(self, node):
+		#True if the node is currently opened
+		return self.pos[node] >= 0
+
+	def is_closed(self, node):
+		return self.pos[node] == CLOSED
+
+	def nodes(self):
+		#return the opened nodes (in heap order, not sorted)
+		return list(self.heap)
+
+	def push(self, node, key):
+		#Add a node that is not opened yet to the heap
+		self.keys[node] = key
+		self.heap.append(node)
+		n = len(self.heap)
+		self.pos[node] = n - 1
+		if n > self.peak:
+			self.peak = n
+		self.sift_up(n - 1)
+
+	def decrease_key(self, node, key):
+		#Lower the priority of an opened node and restore the heap order
+		self.keys[node] = key
+		self.sift_up(self.pos[node])
+
+	def update(self, node, key):
+		#Change the priority of an opened node in either direction
+		old = self.keys[node]
+		self.keys[node] = key
+		if key < old:
+			self.sift_up(self.pos[node])
+		else:
+			self.sift_down(self.pos[node])
+
+	def remove(self, node):
+		#Remove an opened node without closing it, it is marked unseen again
+		heap = self.heap
+		i = self.pos[node]
+		last = heap.pop()
+		if last != node:
+			heap[i] = last
+			self.pos[last] = i
+			self.sift_up(i)
+			self.sift_down(self.pos[last])
+		self.pos[node] = UNSEEN
+		del self.keys[node]
+
+	def top_key(self):
+		#return the lowest key, the heap must not be empty
+		return self.keys[self.heap[0]]
+
+	def pop(self):
+		#Remove and return the node with the lowest key, the node is marked closed
+		heap = self.heap
+		node = heap[0]
+		last = heap.pop()
+		if heap:
+			heap[0] = last
+			self.pos[last] = 0
+			self.sift_down(0)
+		self.pos[node] = CLOSED
+		del self.keys[node]
+		return node
+
+	def sift_up(self, i):
+		heap = self.heap
+		keys = self.keys
+		pos = self.pos
+		node = heap[i]
+		key = keys[node]
+		while i > 0:
+			parent = (i - 1) >> 1
+			other = heap[parent]
+			if key >= keys[other]:
+				break
+			heap[i] = other
+			pos[other] = i
+			i = parent
+		heap[i] = node
+		pos[node] = i
+
+	def sift_down(self, i):
+		heap = self.heap
+		keys = self.keys
+		pos = self.pos
+		n = len(heap)
+		node = heap[i]
+		key = keys[node]
+		while True:
+			child = 2 * i + 1
+			if child >= n:
+				break
+			if child + 1 < n and keys[heap[child + 1]] < keys[heap[child]]:
+				child += 1
+			other = heap[child]
+			if key <= keys[other]:
+				break
+			heap[i] = other
+			pos[other] = i
+			i = child
+		heap[i] = node
+		pos[node] = i
+
+
+class IndexedQueue(IndexedHeap):
+	#FIFO open set for BFS with the same interface and state flags as
+	#IndexedHeap. Keys are stored but do not affect the order.
+	def __init__(self, size):
+		IndexedHeap.__init__(self, size)
+		self.heap = deque()
+
+	def push(self, node, key):
+		self.keys[node] = key
+		self.heap.append(node)
+		self.pos[node] = 0
+		if len(self.heap) > self.peak:
+			self.peak = len(self.heap)
+
+	def decrease_key(self, node, key):
+		#The queue position of a node never changes in BFS
+		self.keys[node] = key
+
+	def pop(self):
+		node = self.heap.popleft()
+		self.pos[node] = CLOSED
+		del self.keys[node]
+		return node
@@ -0,0 +1,178 @@
+
+#Instrumentation of the searches: counters, phase timers and event hooks.
+#The counters are cheap to keep: the nodes pushed and expanded are read from
+#the state flags of the indexed open set after the search, so the loop only
+#counts the decrease-keys. The hooks are optional, the search calls them
+#when a node is opened or expanded and when the path is found, a search
+#without a hook only pays for one check of None per event.
+#TraceWriter is a hook that streams the events to a trace file, which is
+#replayed as an animated GIF with the rendering of render.py:
+#Usage: python instrument.py board.txt trace.txt out.gif [frames]
+
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from grid import load_board
+from indexedHeap import CLOSED, UNSEEN
+
+#number of frames of a replay, and the size of the frames in pixels a side
+FRAMES = 60
+ANIMATION_PIXELS = 800
+#milliseconds per frame, the last frame (with the path) is shown longer
+FRAME_MS = 80
+LAST_FRAME_MS = 2000
+
+
+class SearchStats():
+	#Parameters:
+	#expansions - nodes popped from the open set (the goal included)
+	#pushes - nodes put in the open set
+	#decrease_keys - keys lowered for nodes that were already opened
+	#stale_pops - popped entries that were out of date. The indexed open sets
+	#update their entries in place, so this is 0 for them, it is kept for
+	#searches with a lazy heap
+	#peak - the largest number of nodes opened at the same time
+	#phases - seconds spent in each phase (load, search, path, render), in the
+	#order they were first entered
+	def __init__(self):
+		self.expansions = 0
+		self.pushes = 0
+		self.decrease_keys = 0
+		self.stale_pops = 0
+		self.peak = 0
+		self.phases = OrderedDict()
+
+	@contextmanager
+	def phase(self, name):
+		#time a block, repeated phases add up
+		begin = time.time()
+		try:
+			yield
+		finally:
+			self.phases[name] = self.phases.get(name, 0.0) + time.time() - begin
+
+	def as_dict(self):
+		return {"expansions": self.expansions, "pushes": self.pushes, "decrease_keys": self.decrease_keys,
+			"stale_pops": self.stale_pops, "peak": self.peak, "phases": dict(self.phases)}
+
+	def __str__(self):
+		counters = "expansions %d, pushes %d, decrease-keys %d, stale pops %d, peak open %d" % (
+			self.expansions, self.pushes, self.decrease_keys, self.stale_pops, self.peak)
+		phases = ", ".join("%s %.4f s" % item for item in self.phases.items())
+		return counters + ("; " + phases if phases else "")
+
+
+class SearchHook():
+	#The events a search reports to a hook, they do nothing here
+	def begin(self, grid):
+		#the board is loaded and the search starts
+		pass
+
+	def push(self, node):
+		pass
+
+	def expand(self, node):
+		pass
+
+	def done(self, path):
+		#the search is over, path is the list of nodes from start to goal ([] if none)
+		pass
+
+
+class TraceWriter(SearchHook):
+	#Writes the events of a search to a trace file: a header line with the
+	#board size, then one line per event, "o node" for a node that is opened,
+	#"e node" for a node that is expanded and "p node" for every node of the path
+	#Parameters:
+	#filename - the trace file, written from the start of the search
+	#out - the open trace file
+	def __init__(self, filename):
+		self.filename = filename
+		self.out = None
+
+	def begin(self, grid):
+		self.out = open(self.filename, "w")
+		self.out.write("trace %d %d\n" % (grid.grid_width, grid.grid_height))
+
+	def push(self, node):
+		self.out.write("o %d\n" % node)
+
+	def expand(self, node):
+		self.out.write("e %d\n" % node)
+
+	def done(self, path):
+		for node in path:
+			self.out.write("p %d\n" % node)
+		self.out.close()
+
+
+def count_open_set(stats, opened):
+	#Add the expansions, pushes and peak of an indexed open set to the stats,
+	#read from its state flags after the search
+	pos = np.frombuffer(opened.pos, np.int32)
+	stats.expansions += int(np.count_nonzero(pos == CLOSED))
+	stats.pushes += int(np.count_nonzero(pos != UNSEEN))
+	stats.peak += opened.peak
+
+
+def read_trace(filename):
+	#return the board size and the (kind, node) events of a trace file
+	with open(filename) as f:
+		header = f.readline().split()
+		if len(header) != 3 or header[0] != "trace":
+			raise ValueError("%s is not a trace file" % filename)
+		events = []
+		for line in f:
+			kind, node = line.split()
+			events.append((kind, int(node)))
+	return int(header[1]), int(header[2]), events
+
+
+def replay(grid, tracefile, target, frames=FRAMES):
+	#Render the search of a trace file as an animated GIF, the closed and
+	#opened nodes after every few expansions and the path in the last frame
+	#(render needs PIL, which the searches that only keep stats do not)
+	import render
+	width, height, events = read_trace(tracefile)
+	if (width, height) != (grid.grid_width, grid.grid_height):
+		raise ValueError("the trace is of a %dx%d board, not %dx%d" % (width, height, grid.grid_width, grid.grid_height))
+	colours = render.UNIFORM_COLOURS if grid.is_uniform() else render.WEIGHTED_COLOURS
+	#(the weighted markers are the ones with glyphs for closed and opened nodes)
+	markers = render.WEIGHTED_MARKERS
+	scale = max(1, min(render.CELL_SIZE, ANIMATION_PIXELS // max(width, height, 1)))
+	step = max(1, -(-sum(1 for (kind, node) in events if kind == "e") // frames))
+	opened = np.zeros(len(grid), bool)
+	closed = np.zeros(len(grid), bool)
+	path = []
+	images = []
+
+	def frame():
+		cells = {"path": path, "start": [grid.start], "goal": [grid.goal], "closed": closed.copy(), "opened": opened & ~closed}
+		images.append(render.render(grid, colours, markers, cells, scale))
+
+	expanded = 0
+	for (kind, node) in events:
+		if kind == "o":
+			opened[node] = True
+		elif kind == "e":
+			closed[node] = True
+			expanded += 1
+			if expanded % step == 0:
+				frame()
+		elif kind == "p":
+			path.append(node)
+	frame()
+	durations = [FRAME_MS] * (len(images) - 1) + [LAST_FRAME_MS]
+	images[0].save(target, "GIF", save_all=True, append_images=images[1:], duration=durations, loop=0)
+	return len(images)
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 4:
+		sys.exit("usage: python instrument.py board.txt trace.txt out.gif [frames]")
+	count = replay(load_board(sys.argv[1]), sys.argv[2], sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else FRAMES)
+	print("%d frames written to %s" % (count, sys.argv[3]))
@@ -0,0 +1,206 @@
+
+#Jump Point Search for 4-connected boards where every reachable cell has the
+#same cost (the board-1-* maps).
+#Instead of opening every neighbour, the search jumps in a straight line from
+#a node until it meets the goal or a cell with a forced neighbour (a cell
+#next to the end of an obstacle). Only these jump points are put in the open
+#set, which removes the many symmetric, equally good paths through open areas.
+#When moving along y the search also stops at cells from which a jump along x
+#finds a jump point, so no turn that an optimal path might need is skipped.
+#
+#The goal independent part of every jump (the next forced cell in each of the
+#four directions) is precomputed once per board with numpy, so a jump is O(1)
+#instead of a walk over the cells of the line.
+
+import numpy as np
+
+from indexedHeap import IndexedHeap
+
+
+def next_stop(stop, blocked):
+	#For every cell, return the x coordinate of the first cell with stop set
+	#strictly after it along axis 0 (increasing x) and before the next
+	#blocked cell, or -1 if there is none
+	width = stop.shape[0]
+	idx = np.arange(width).reshape(width, 1)
+	none = np.int32(width)
+	stops = np.where(stop, idx, none)
+	walls = np.where(blocked, idx, none)
+	#minimum over all x' >= x, then shifted by one to get x' > x
+	stops = np.minimum.accumulate(stops[::-1], axis=0)[::-1]
+	walls = np.minimum.accumulate(walls[::-1], axis=0)[::-1]
+	ahead_stops = np.full(stop.shape, none, np.int32)
+	ahead_walls = np.full(stop.shape, none, np.int32)
+	ahead_stops[:-1] = stops[1:]
+	ahead_walls[:-1] = walls[1:]
+	return np.where(ahead_stops < ahead_walls, ahead_stops, -1).astype(np.int32)
+
+
+def previous_stop(stop, blocked):
+	#The same as next_stop for decreasing x
+	width = stop.shape[0]
+	found = next_stop(stop[::-1], blocked[::-1])[::-1]
+	return np.where(found >= 0, width - 1 - found, -1).astype(np.int32)
+
+
+class JumpPointSearch():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#step - the cost of entering any reachable cell
+	#jumps - the next forced cell (coordinate along the direction, or -1) for
+	#each of the directions (1,0), (-1,0), (0,1), (0,-1), as 2D arrays
+	#runs_x, runs_y - id of the obstacle-free run along x / y each reachable cell is in
+	#opened - indexed heap of opened jump points, with state flags for every node
+	#g - cost from start to each jump point found so far
+	#parent - the jump point each jump point was reached from
+	#start - The starting node
+	#goal - The ending node
+	def __init__(self, grid, start=None, goal=None):
+		if not grid.is_uniform():
+			raise ValueError("Jump Point Search needs a board where every reachable cell has the same cost")
+		self.grid = grid
+		self.start = grid.start if start is None else start
+		self.goal = grid.goal if goal is None else goal
+		self.step = int(grid.costs[self.start]) or 1
+		self.opened = None
+		self.g = {}
+		self.parent = {}
+		self.init_jumps()
+
+	def init_jumps(self):
+		#Precompute the goal independent jump tables of the board
+		shape = (self.grid.grid_width, self.grid.grid_height)
+		reachable = np.zeros((shape[0] + 2, shape[1] + 2), bool)
+		reachable[1:-1, 1:-1] = self.grid.costs.reshape(shape) != 0
+		#reachable cells and their neighbours, padded with unreachable cells
+		here = reachable[1:-1, 1:-1]
+		up = reachable[:-2, 1:-1]
+		down = reachable[2:, 1:-1]
+		left = reachable[1:-1, :-2]
+		right = reachable[1:-1, 2:]
+		up_left = reachable[:-2, :-2]
+		up_right = reachable[:-2, 2:]
+		down_left = reachable[2:, :-2]
+		down_right = reachable[2:, 2:]
+		blocked = ~here
+		#forced cells when moving along x: an obstacle next to the previous
+		#cell ends beside this one
+		forced_down = here & ((left & ~up_left) | (right & ~up_right))
+		forced_up = here & ((left & ~down_left) | (right & ~down_right))
+		jump_down = next_stop(forced_down, blocked)
+		jump_up = previous_stop(forced_up, blocked)
+		#moving along y also stops where a jump along x finds something
+		turn = (jump_down >= 0) | (jump_up >= 0)
+		forced_right = here & (turn | (up & ~up_left) | (down & ~down_left))
+		forced_left = here & (turn | (up & ~up_right) | (down & ~down_right))
+		jump_right = next_stop(forced_right.T, blocked.T).T
+		jump_left = previous_stop(forced_left.T, blocked.T).T
+		self.jumps = {(1, 0): jump_down, (-1, 0): jump_up, (0, 1): jump_right, (0, -1): jump_left}
+		self.runs_x = np.cumsum(blocked, axis=0, dtype=np.int32)
+		self.runs_y = np.cumsum(blocked, axis=1, dtype=np.int32)
+
+	def is_reachable(self, x, y):
+		grid = self.grid
+		return 0 <= x < grid.grid_width and 0 <= y < grid.grid_height and grid.costs[x * grid.grid_height + y] != 0
+
+	def jump(self, x, y, dx, dy):
+		#jump from (x,y) in direction (dx,dy), return the first jump point or None
+		height = self.grid.grid_height
+		gx, gy = self.grid.get_coords(self.goal)
+		stop = int(self.jumps[(dx, dy)][x, y])
+		if dx != 0:
+			#the goal stops the jump if it is ahead on the same obstacle-free run
+			if gy == y and (gx - x) * dx > 0 and self.runs_x[gx, y] == self.runs_x[x, y]:
+				if stop < 0 or (stop - gx) * dx > 0:
+					stop = gx
+			return None if stop < 0 else stop * height + y
+		#along y, stop on the goal's row if a jump along x from there reaches the goal
+		#(run ids are only comparable between reachable cells)
+		if (gy - y) * dy > 0 and self.grid.costs[x * height + gy] != 0 and \
+				self.runs_y[x, gy] == self.runs_y[x, y] and self.runs_x[x, gy] == self.runs_x[gx, gy]:
+			if stop < 0 or (stop - gy) * dy > 0:
+				stop = gy
+		return None if stop < 0 else x * height + stop
+
+	def get_directions(self, node):
+		#return the directions (dx,dy) to jump in from a node, pruned by the
+		#direction the node was reached from
+		reachable = self.is_reachable
+		x, y = self.grid.get_coords(node)
+		if node not in self.parent:
+			directions = [(1, 0), (0, -1), (-1, 0), (0, 1)]
+		else:
+			px, py = self.grid.get_coords(self.parent[node])
+			dx = (x > px) - (x < px)
+			dy = (y > py) - (y < py)
+			if dx != 0:
+				directions = [(0, -1), (0, 1), (dx, 0)]
+			else:
+				directions = [(-1, 0), (1, 0), (0, dy)]
+		return [(dx, dy) for (dx, dy) in directions if reachable(x+dx, y+dy)]
+
+	def get_successors(self, node):
+		#return the jump points reachable in a straight line from a node
+		x, y = self.grid.get_coords(node)
+		successors = []
+		for (dx, dy) in self.get_directions(node):
+			jump = self.jump(x, y, dx, dy)
+			if jump is not None:
+				successors.append(jump)
+		return successors
+
+	def process(self):
+		#A* over the jump points
+		grid = self.grid
+		self.opened = IndexedHeap(len(grid))
+		self.g = {self.start: 0}
+		self.parent = {}
+		self.opened.push(self.start, self.step * grid.get_heuristic(self.start, self.goal))
+		while (len(self.opened)):
+			node = self.opened.pop()
+			if node == self.goal:
+				return True
+			for jump in self.get_successors(node):
+				if self.opened.is_closed(jump):
+					continue
+				g = self.g[node] + self.step * grid.get_heuristic(node, jump)
+				if jump in self.opened:
+					if g < self.g[jump]:
+						self.g[jump] = g
+						self.parent[jump] = node
+						self.opened.decrease_key(jump, g + self.step * grid.get_heuristic(jump, self.goal))
+				else:
+					self.g[jump] = g
+					self.parent[jump] = node
+					self.opened.push(jump, g + self.step * grid.get_heuristic(jump, self.goal))
+		return False
+
+	def get_jump_points(self):
+		#return the jump points of the path from start to goal
+		if not self.opened.is_closed(self.goal):
+			return []
+		points = [self.goal]
+		while points[-1] != self.start:
+			points.append(self.parent[points[-1]])
+		points.reverse()
+		return points
+
+	def get_path(self):
+		#return the path from start to goal expanded back to every single node,
+		#consecutive jump points always lie on a straight line
+		points = self.get_jump_points()
+		if not points:
+			return []
+		path = [points[0]]
+		for node in points[1:]:
+			prev = path[-1]
+			x, y = self.grid.get_coords(prev)
+			nx, ny = self.grid.get_coords(node)
+			if nx != x:
+				delta = (1 if nx > x else -1) * self.grid.grid_height
+			else:
+				delta = 1 if ny > y else -1
+			while prev != node:
+				prev += delta
+				path.append(prev)
+		return path
@@ -0,0 +1,169 @@
+
+#ALT heuristic (A*, Landmarks, Triangle inequality) for the weighted boards.
+#A few landmark cells are chosen far apart from each other (farthest point
+#selection) and the exact cost from every landmark to every cell, and from
+#every cell to every landmark, is precomputed with Dijkstra on the cost model
+#of astarPart2 (a move costs the value of the cell that is entered, so the
+#two directions differ). For a landmark L the triangle inequality gives two
+#lower bounds on the cost d(v, t) of going from v to the goal t:
+# d(L, t) - d(L, v)   and   d(v, L) - d(t, L)
+#The heuristic is the largest of these bounds over all landmarks (and the
+#manhattan distance times the cheapest cost), which is admissible and
+#consistent. The bounds for a goal are computed for all cells at once with
+#numpy. The distance tables are saved next to the board file
+#(board-2-1.alt.npz) and reused while the board and the landmark count are
+#unchanged.
+
+import heapq
+import os
+
+import numpy as np
+
+from grid import atomic_save, board_hash
+
+LANDMARK_COUNT = 8
+#distance of the cells that cannot be reached
+UNREACHED = -1
+
+
+def dijkstra(grid, source, reverse=False):
+	#Dijkstra from source over the whole board. Returns (dist, parent) int32
+	#arrays, UNREACHED / -1 for cells that cannot be reached. With reverse,
+	#dist is the cost of going from each cell to source and parent is the
+	#next cell on the way to source.
+	costs = grid.costs.tolist()
+	height = grid.grid_height
+	size = len(grid)
+	dist = [UNREACHED] * size
+	parent = [-1] * size
+	dist[source] = 0
+	heap = [(0, source)]
+	while heap:
+		d, node = heapq.heappop(heap)
+		if d > dist[node]:
+			continue
+		x, y = divmod(node, height)
+		#the neighbours of node, in the order of Grid.get_neighbours
+		adjs = []
+		if x < grid.grid_width-1:
+			adjs.append(node+height)
+		if y > 0:
+			adjs.append(node-1)
+		if x > 0:
+			adjs.append(node-height)
+		if y < height-1:
+			adjs.append(node+1)
+		for adj in adjs:
+			cost = costs[adj]
+			if not cost:
+				continue
+			nd = d + (costs[node] if reverse else cost)
+			old = dist[adj]
+			if old == UNREACHED or nd < old:
+				dist[adj] = nd
+				parent[adj] = node
+				heapq.heappush(heap, (nd, adj))
+	return np.array(dist, np.int32), np.array(parent, np.int32)
+
+
+def landmark_filename(filename):
+	#the distance tables of boards/board-2-1.txt are in boards/board-2-1.alt.npz
+	return os.path.splitext(filename)[0] + ".alt.npz"
+
+
+class Landmarks():
+	#Parameters:
+	#grid - the board as a Grid, see grid.py
+	#count - the number of landmarks
+	#landmarks - the landmark nodes
+	#dist_from - (count, nodes) int32 array, cost from each landmark to each node
+	#dist_to - (count, nodes) int32 array, cost from each node to each landmark
+	#bounds - the heuristic of every node for the goal in bounds_goal
+	def __init__(self, grid, filename=None, count=LANDMARK_COUNT):
+		self.grid = grid
+		self.count = count
+		self.min_cost = grid.get_min_cost()
+		self.landmarks = []
+		self.dist_from = None
+		self.dist_to = None
+		self.bounds = None
+		self.bounds_goal = None
+		if filename is None:
+			self.build()
+		else:
+			self.load_or_build(landmark_filename(filename))
+
+	def build(self):
+		#Farthest point selection: every new landmark is the reachable cell
+		#with the largest cost from the landmarks chosen so far
+		grid = self.grid
+		reachable = np.flatnonzero(grid.costs != 0)
+		self.landmarks = []
+		dist_from = []
+		dist_to = []
+		if len(reachable) == 0:
+			self.dist_from = np.zeros((0, len(grid)), np.int32)
+			self.dist_to = np.zeros((0, len(grid)), np.int32)
+			return
+		#the first landmark is the cell farthest from an arbitrary cell
+		dist, parent = dijkstra(grid, int(reachable[0]))
+		nearest = np.where(dist == UNREACHED, -1, dist).astype(np.int64)
+		for i in range(min(self.count, len(reachable))):
+			landmark = int(np.argmax(nearest))
+			if i > 0 and nearest[landmark] <= 0:
+				#every reachable cell is a landmark already
+				break
+			self.landmarks.append(landmark)
+			dist, parent = dijkstra(grid, landmark)
+			dist_from.append(dist)
+			dist_to.append(dijkstra(grid, landmark, reverse=True)[0])
+			#cells not reached from this landmark are in another region, which
+			#the next landmarks should cover first
+			far = np.where(dist == UNREACHED, np.iinfo(np.int64).max, dist)
+			nearest = far if i == 0 else np.minimum(nearest, far)
+			nearest[grid.costs == 0] = -1
+			nearest[self.landmarks] = -1
+		self.dist_from = np.array(dist_from, np.int32)
+		self.dist_to = np.array(dist_to, np.int32)
+
+	def save(self, tablefile, boardhash):
+		#Write the distance tables, see grid.atomic_save
+		atomic_save(tablefile, lambda f: np.savez(f, board_hash=np.array(boardhash), count=np.array(self.count),
+			landmarks=np.array(self.landmarks, np.int64), dist_from=self.dist_from, dist_to=self.dist_to))
+
+	def load_or_build(self, tablefile):
+		#Load the distance tables saved next to the board, or build and save them
+		boardhash = board_hash(self.grid)
+		if os.path.exists(tablefile):
+			data = np.load(tablefile)
+			if str(data["board_hash"]) == boardhash and int(data["count"]) == self.count:
+				self.landmarks = data["landmarks"].tolist()
+				self.dist_from = data["dist_from"]
+				self.dist_to = data["dist_to"]
+				return
+		self.build()
+		self.save(tablefile, boardhash)
+
+	def get_bounds(self, goal):
+		#return the heuristic of every node for a goal as an int64 array
+		if self.bounds_goal == goal:
+			return self.bounds
+		grid = self.grid
+		xs, ys = np.divmod(np.arange(len(grid)), grid.grid_height)
+		gx, gy = grid.get_coords(goal)
+		bounds = self.min_cost * (np.abs(xs - gx) + np.abs(ys - gy))
+		for dist_from, dist_to in zip(self.dist_from, self.dist_to):
+			#the bounds only hold where both costs are known
+			if dist_from[goal] != UNREACHED:
+				known = dist_from != UNREACHED
+				bounds = np.where(known, np.maximum(bounds, int(dist_from[goal]) - dist_from.astype(np.int64)), bounds)
+			if dist_to[goal] != UNREACHED:
+				known = dist_to != UNREACHED
+				bounds = np.where(known, np.maximum(bounds, dist_to.astype(np.int64) - int(dist_to[goal])), bounds)
+		self.bounds = bounds
+		self.bounds_goal = goal
+		return bounds
+
+	def get_heuristic(self, node, goal):
+		#return a lower bound on the cost of going from node to goal
+		return int(self.get_bounds(goal)[node])
@@ -0,0 +1,184 @@
+
+#Cache of optimal paths for repeated queries on the same boards.
+#Paths are kept by (board hash, start, goal) in a least recently used cache
+#that is bounded by memory, like the distance fields of distanceField.py.
+#A part of an optimal path is itself an optimal path, so a cached path also
+#answers every query from one of its cells to a later one: the cost of the
+#part is read from the running sum of the cell costs along the path. (Only
+#in the direction of the path, a move costs the cell that is entered, so the
+#reversed path does not have the same cost.)
+#Every board has an index from node to the cached paths through it and the
+#position of the node on them, which finds these sub-paths without a scan.
+#When cell costs change, a path stays optimal as long as no cell on it got
+#more expensive and no cell anywhere got cheaper. update_costs moves those
+#paths to the hash of the changed board and drops the others.
+
+from collections import OrderedDict
+
+import numpy as np
+
+from grid import BLOCKED, board_hash
+
+#memory bound of the default cache, in bytes
+CACHE_BYTES = 32 * 1024 * 1024
+#estimated memory of the index for every node of a cached path (dict entries), in bytes
+INDEX_BYTES = 200
+
+
+class CachedPath():
+	#Parameters:
+	#path - int32 array, the nodes of the path from start to goal
+	#sums - int64 array, the cost from the start to every node of the path
+	def __init__(self, grid, path):
+		self.path = np.asarray(path, np.int32)
+		self.sums = np.zeros(len(path), np.int64)
+		np.cumsum(grid.costs[self.path[1:]], out=self.sums[1:])
+
+	@property
+	def nbytes(self):
+		#the memory used by the path and its part of the index, in bytes
+		return self.path.nbytes + self.sums.nbytes + len(self.path) * INDEX_BYTES
+
+	def get_part(self, first, last):
+		#return the nodes and the cost of the part of the path between two positions
+		return self.path[first:last + 1].tolist(), int(self.sums[last] - self.sums[first])
+
+
+class PathCache():
+	#LRU cache of optimal paths with parameters:
+	#max_bytes - the memory bound of the paths kept
+	#paths - (board hash, start, goal) -> CachedPath, least recently used first
+	#index - board hash -> node -> {key of a path through the node: position of the node on it}
+	#size - the memory used by the paths kept, in bytes
+	#hits, misses - number of lookups that found / did not find a path
+	#subpath_hits - hits answered by a part of a path cached for other endpoints
+	#evictions, invalidations - paths dropped for memory / after a cost change
+	def __init__(self, max_bytes=CACHE_BYTES):
+		self.max_bytes = max_bytes
+		self.paths = OrderedDict()
+		self.index = {}
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.subpath_hits = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	def __len__(self):
+		return len(self.paths)
+
+	def get(self, boardhash, start, goal):
+		#return (path, cost) of a cached path from start to goal, None on a miss
+		key = (boardhash, start, goal)
+		cached = self.paths.get(key)
+		if cached is not None:
+			self.paths[key] = self.paths.pop(key)
+			self.hits += 1
+			return cached.get_part(0, len(cached.path) - 1)
+		nodes = self.index.get(boardhash, {})
+		froms = nodes.get(start)
+		tos = nodes.get(goal)
+		if froms and tos:
+			for key, first in froms.items():
+				last = tos.get(key)
+				if last is not None and last >= first:
+					cached = self.paths.pop(key)
+					self.paths[key] = cached
+					self.hits += 1
+					self.subpath_hits += 1
+					return cached.get_part(first, last)
+		self.misses += 1
+		return None
+
+	def put(self, grid, path, boardhash=None):
+		#Keep an optimal path (list of nodes from start to goal) of a board.
+		#The board hash can be passed in when the caller already has it.
+		#A path through a blocked cell is not a path and raises a ValueError.
+		if not path:
+			return
+		if (grid.costs[path] == BLOCKED).any():
+			raise ValueError("the path goes through a blocked cell")
+		boardhash = board_hash(grid) if boardhash is None else boardhash
+		key = (boardhash, path[0], path[-1])
+		if key in self.paths:
+			self.drop(key)
+		self.add(key, CachedPath(grid, path))
+		#evict the least recently used paths, but always keep the newest one
+		while self.size > self.max_bytes and len(self.paths) > 1:
+			self.drop(next(iter(self.paths)))
+			self.evictions += 1
+
+	def add(self, key, cached):
+		#Add a path as the most recently used one and index its nodes
+		self.paths[key] = cached
+		self.size += cached.nbytes
+		nodes = self.index.setdefault(key[0], {})
+		for position, node in enumerate(cached.path.tolist()):
+			nodes.setdefault(node, {})[key] = position
+
+	def drop(self, key):
+		#Remove a path and its index entries
+		cached = self.paths.pop(key)
+		self.size -= cached.nbytes
+		nodes = self.index[key[0]]
+		for node in cached.path.tolist():
+			keys = nodes[node]
+			del keys[key]
+			if not keys:
+				del nodes[node]
+		if not nodes:
+			del self.index[key[0]]
+
+	def drop_board(self, boardhash):
+		#Invalidate every path of a board
+		for key in [key for key in self.paths if key[0] == boardhash]:
+			self.drop(key)
+			self.invalidations += 1
+
+	def rehash(self, oldhash, newhash, changes):
+		#Move the paths of a board that are still optimal after a change of
+		#cell costs to the new board hash and drop the others. changes are
+		#(node, old cost, new cost) triples
+		if any(new != BLOCKED and (old == BLOCKED or new < old) for (node, old, new) in changes):
+			#a cheaper cell can give any query a better path
+			self.drop_board(oldhash)
+			return
+		raised = set(node for (node, old, new) in changes if new == BLOCKED or new > old)
+		for key in [key for key in self.paths if key[0] == oldhash]:
+			cached = self.paths[key]
+			self.drop(key)
+			if raised.intersection(cached.path.tolist()):
+				self.invalidations += 1
+			else:
+				self.add((newhash, key[1], key[2]), cached)
+
+	def update_costs(self, grid, changes, boardhash=None):
+		#Apply a batch of (node, cost) changes to the board and invalidate the
+		#paths they affect. Returns the hash of the changed board
+		oldhash = board_hash(grid) if boardhash is None else boardhash
+		costs = grid.costs
+		applied = []
+		for (node, cost) in changes:
+			if costs[node] != cost:
+				applied.append((node, int(costs[node]), cost))
+				costs[node] = cost
+		newhash = board_hash(grid)
+		if applied:
+			self.rehash(oldhash, newhash, applied)
+		return newhash
+
+	def clear(self):
+		self.paths.clear()
+		self.index.clear()
+		self.size = 0
+
+	def get_stats(self):
+		#the counters of the cache and its hit rate (None before the first lookup)
+		lookups = self.hits + self.misses
+		return {"paths": len(self.paths), "bytes": self.size, "hits": self.hits, "misses": self.misses,
+			"subpath_hits": self.subpath_hits, "evictions": self.evictions, "invalidations": self.invalidations,
+			"hit_rate": round(self.hits / float(lookups), 4) if lookups else None}
+
+
+#the cache shared by the callers of pathfinding.find_cached_path
+PATHS = PathCache()
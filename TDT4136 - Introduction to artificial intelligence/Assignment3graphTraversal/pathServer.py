@@ -0,0 +1,284 @@
+
+#Resident path query service (Python 3, asyncio).
+#Every board in boards/ is parsed once at start up and kept in memory, in the
+#service and in every worker process, so a query only pays for the search.
+#Searches run in a process pool, concurrent identical queries (same board,
+#start, goal, algorithm and budget) are coalesced into one search.
+#The paths of the optimal modes are kept in a path cache (see pathCache.py)
+#of the service, which answers repeated queries, and queries between two
+#cells of a cached path, without a search ("cached": true in the answer).
+#The protocol is one JSON object per line in each direction, answers come in
+#the order of the requests of a connection and echo their "id" if given:
+# {"op": "path", "board": "board-2-1", "start": [x, y], "goal": [x, y], "algorithm": "astar"}
+#   -> {"cost": 79, "length": 34, "expanded": 240, "path": [[x, y], ...]}
+#   (start, goal and algorithm are optional, see pathfinding.py. The anytime
+#   algorithm also takes "budget_ms" and "bound" and answers with the
+#   suboptimality "bound" of its path. The best-first modes answer with the
+#   "stats" of their search: expansions, pushes, decrease_keys, stale_pops,
+#   peak and phase times, see instrument.py)
+# {"op": "stats"}                     -> query counts, p50/p99 latency in ms, cache hit rates
+#                                        and the search counters summed over the searches run
+# {"op": "reload", "board": "board-2-1"} -> parse the board file again, the cached
+#                                          paths that the changed cells affect are dropped
+#Usage: python pathServer.py [address] [workers]
+#address is a unix socket path or host:port (default 127.0.0.1:8642)
+
+import asyncio
+import collections
+import glob
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import pathfinding
+from pathCache import PathCache
+
+ADDRESS = "127.0.0.1:8642"
+BOARD_DIR = "boards"
+#number of latencies kept for the percentiles
+LATENCY_WINDOW = 10000
+
+
+def board_files(directory=BOARD_DIR):
+	#return board name -> file of the boards in a directory, binary boards
+	#take the place of the txt-boards they were converted from
+	files = {}
+	for filename in sorted(glob.glob(os.path.join(directory, "*.txt")) + glob.glob(os.path.join(directory, "*.brd"))):
+		name = os.path.splitext(os.path.basename(filename))[0]
+		if name not in files or filename.endswith(".brd"):
+			files[name] = filename
+	return files
+
+
+def preload(files):
+	#Worker initializer, parse every board once per worker process
+	#(forked workers leave the shutdown to the service, see serve)
+	signal.signal(signal.SIGTERM, signal.SIG_DFL)
+	for filename in files:
+		pathfinding.get_board(filename)
+
+
+def run_query(filename, version, start, goal, algorithm, budget_ms=None, bound=1.0):
+	#Run one search in a worker, with start and goal as (x, y) or None
+	board = pathfinding.get_board(filename, version)
+	grid = board.grid
+	start = pathfinding.get_node(grid, start)
+	goal = pathfinding.get_node(grid, goal)
+	budget = None if budget_ms is None else budget_ms / 1000.0
+	found = pathfinding.find_path(board, start, goal, algorithm, budget, bound)
+	answer = {"cost": found["cost"], "length": len(found["path"]), "expanded": found["expanded"],
+		"path": [list(grid.get_coords(node)) for node in found["path"]]}
+	for name in ("bound", "stats"):
+		if name in found:
+			answer[name] = found[name]
+	return answer
+
+
+def percentile(values, fraction):
+	#nearest rank percentile of a list of numbers, None if it is empty
+	if not values:
+		return None
+	values = sorted(values)
+	return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class PathServer():
+	#Parameters:
+	#files - board name -> board file
+	#boards - board name -> pathfinding.Board kept in memory
+	#pool - the worker processes that run the searches
+	#inflight - query key -> future of the search answering it
+	#latencies - the latest query latencies in seconds
+	#paths - the cache of the paths of the optimal modes
+	#queries, searches, coalesced - number of queries, of searches run and of
+	#queries answered by a search that was already running
+	#counters - the search counters of the searches run, summed
+	def __init__(self, files, workers=None):
+		self.files = files
+		self.boards = {}
+		for name, filename in files.items():
+			self.boards[name] = pathfinding.Board(filename)
+		self.pool = ProcessPoolExecutor(workers, initializer=preload, initargs=(list(files.values()),))
+		self.inflight = {}
+		self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+		self.paths = PathCache()
+		self.queries = 0
+		self.searches = 0
+		self.coalesced = 0
+		self.counters = collections.Counter()
+
+	def get_board(self, name):
+		board = self.boards.get(name)
+		if board is None:
+			raise ValueError("unknown board %r" % name)
+		return board
+
+	async def query(self, request):
+		#Answer a path query
+		board = self.get_board(request.get("board"))
+		if pathfinding.is_cached(board, request.get("algorithm", "astar")):
+			return await self.query_cached(board, request)
+		return await self.search(board, request)
+
+	async def search(self, board, request):
+		#Run the search of a query in the pool, sharing the search of an
+		#identical running query
+		start = request.get("start")
+		goal = request.get("goal")
+		key = (board.filename, board.version, None if start is None else tuple(start),
+			None if goal is None else tuple(goal), request.get("algorithm", "astar"),
+			request.get("budget_ms"), request.get("bound", 1.0))
+		future = self.inflight.get(key)
+		if future is None:
+			self.searches += 1
+			loop = asyncio.get_running_loop()
+			future = asyncio.ensure_future(loop.run_in_executor(self.pool, run_query, *key))
+			self.inflight[key] = future
+			future.add_done_callback(lambda done: self.finish(key, done))
+		else:
+			self.coalesced += 1
+		#(shield, so a client that goes away does not cancel a shared search)
+		return dict(await asyncio.shield(future))
+
+	def finish(self, key, future):
+		#A search is done, add its counters to the totals
+		self.inflight.pop(key, None)
+		if not future.cancelled() and future.exception() is None:
+			stats = future.result().get("stats")
+			if stats is not None:
+				for name in ("expansions", "pushes", "decrease_keys", "stale_pops"):
+					self.counters[name] += stats[name]
+				self.counters["search_seconds"] += stats["phases"].get("search", 0.0)
+
+	async def query_cached(self, board, request):
+		#Answer a query of an optimal mode from the path cache, or search and
+		#keep the path
+		grid = board.grid
+		start = pathfinding.get_node(grid, request.get("start"))
+		goal = pathfinding.get_node(grid, request.get("goal"))
+		start = pathfinding.check_node(grid, grid.start if start is None else start)
+		goal = pathfinding.check_node(grid, grid.goal if goal is None else goal)
+		hit = self.paths.get(board.boardhash, start, goal)
+		if hit is not None:
+			path, cost = hit
+			return {"cost": cost, "length": len(path), "expanded": 0, "cached": True,
+				"path": [list(grid.get_coords(node)) for node in path]}
+		answer = await self.search(board, request)
+		#(a path of a board that was reloaded during the search is not kept)
+		if answer["path"] and self.boards.get(request.get("board")) is board:
+			self.paths.put(grid, [grid.get_index(x, y) for (x, y) in answer["path"]], board.boardhash)
+		return answer
+
+	def reload(self, request):
+		#Parse a board file again, the workers load the new version on their next query.
+		#The cached paths that stay optimal on the new board are kept
+		name = request.get("board")
+		old = self.get_board(name)
+		new = self.boards[name] = pathfinding.Board(old.filename, old.version + 1)
+		if new.boardhash != old.boardhash:
+			if new.grid.costs.shape == old.grid.costs.shape:
+				changed = np.flatnonzero(new.grid.costs != old.grid.costs).tolist()
+				self.paths.rehash(old.boardhash, new.boardhash,
+					[(node, int(old.grid.costs[node]), int(new.grid.costs[node])) for node in changed])
+			else:
+				#the board changed its size, nothing carries over
+				self.paths.drop_board(old.boardhash)
+		return {"board": name, "version": new.version}
+
+	def stats(self):
+		latencies = list(self.latencies)
+		p50 = percentile(latencies, 0.5)
+		p99 = percentile(latencies, 0.99)
+		return {"queries": self.queries, "searches": self.searches, "coalesced": self.coalesced,
+			"boards": sorted(self.boards),
+			"p50_ms": None if p50 is None else round(1000 * p50, 3),
+			"p99_ms": None if p99 is None else round(1000 * p99, 3), "cache": self.paths.get_stats(),
+			"search": dict(self.counters)}
+
+	async def handle(self, request):
+		#return the answer to one request
+		if not isinstance(request, dict):
+			raise ValueError("a request must be a JSON object")
+		op = request.get("op", "path")
+		if op == "path":
+			begin = time.time()
+			answer = await self.query(request)
+			self.queries += 1
+			self.latencies.append(time.time() - begin)
+			return answer
+		if op == "stats":
+			return self.stats()
+		if op == "reload":
+			return self.reload(request)
+		raise ValueError("unknown op %r" % op)
+
+	async def serve_client(self, reader, writer):
+		#Answer the requests of one connection, one JSON line each
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				request = {}
+				try:
+					request = json.loads(line.decode("utf-8"))
+					answer = await self.handle(request)
+				except (KeyError, IndexError, TypeError, ValueError, OSError) as e:
+					if not isinstance(request, dict):
+						request = {}
+					answer = {"error": "%s: %s" % (type(e).__name__, e)}
+				if "id" in request:
+					answer["id"] = request["id"]
+				writer.write((json.dumps(answer) + "\n").encode("utf-8"))
+				await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			writer.close()
+
+	async def serve(self, address=ADDRESS):
+		#Listen on a unix socket path or on host:port until cancelled, SIGTERM cancels
+		asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+		if ":" in address:
+			host, port = address.rsplit(":", 1)
+			server = await asyncio.start_server(self.serve_client, host, int(port))
+		else:
+			if os.path.exists(address):
+				os.remove(address)
+			server = await asyncio.start_unix_server(self.serve_client, address)
+		async with server:
+			await server.serve_forever()
+
+	def close(self):
+		self.pool.shutdown()
+
+
+def request(address, message):
+	#Send one request to a running server and return the answer, for scripts and tests
+	if ":" in address:
+		host, port = address.rsplit(":", 1)
+		sock = socket.create_connection((host, int(port)))
+	else:
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		sock.connect(address)
+	with sock, sock.makefile("rwb") as f:
+		f.write((json.dumps(message) + "\n").encode("utf-8"))
+		f.flush()
+		return json.loads(f.readline().decode("utf-8"))
+
+
+if __name__ == "__main__":
+	address = sys.argv[1] if len(sys.argv) > 1 else ADDRESS
+	server = PathServer(board_files(), int(sys.argv[2]) if len(sys.argv) > 2 else None)
+	try:
+		asyncio.run(server.serve(address))
+	except (KeyboardInterrupt, asyncio.CancelledError):
+		pass
+	finally:
+		server.close()
@@ -0,0 +1,278 @@
+
+#Importable path finding API and a batch runner.
+#find_path runs one query on a Board with any of the search modes of the
+#scripts, without their interactive input and module globals. The batch
+#runner reads a manifest of jobs, one JSON object per line:
+# {"board": "boards/board-2-1.txt", "start": [x, y], "goal": [x, y], "algorithm": "astar"}
+#(start and goal are optional and default to 'A' and 'B', algorithm defaults
+#to astar, the anytime mode also reads "budget_ms" and "bound"), spreads the
+#jobs over a pool of worker processes, where every board is loaded once per
+#worker, and writes one JSON line per job to stdout:
+# {"job": 0, "board": ..., "algorithm": ..., "cost": 79, "length": 34, "expanded": 240, "seconds": 0.001}
+#The searches of the best-first modes add their counters and phase times as
+#"stats" (expansions, pushes, decrease_keys, stale_pops, peak, phases).
+#Repeated queries of the optimal modes are answered from a path cache in
+#every worker (see pathCache.py), their result lines have "cached": true.
+#Usage: python pathfinding.py manifest.jsonl [workers]   (default is one worker per core)
+
+import json
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+try:
+	from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+	#Python 2 without the futures backport, multiprocessing.Pool is used instead
+	ProcessPoolExecutor = None
+
+from anytimeAStar import AnytimeAStar
+from bestFirstSearch import BestFirstSearch
+from bidirectional import BidirectionalSearch
+from distanceField import FieldCache
+from dStarLite import DStarLite
+from grid import BLOCKED, board_hash, load_board
+from hierarchical import HierarchicalAStar
+from indexedHeap import CLOSED
+from jumpPoint import JumpPointSearch
+from landmarks import Landmarks
+from pathCache import PATHS
+
+ALGORITHMS = ["astar", "bfs", "dijkstra", "hpa", "bidir-astar", "bidir-dijkstra", "alt", "field", "jps", "dstar", "anytime"]
+#the modes that find optimal paths, they share the path cache (jps only on
+#the uniform boards it runs on, see is_cached)
+OPTIMAL = set(["astar", "dijkstra", "bidir-astar", "bidir-dijkstra", "alt", "field", "jps", "dstar"])
+#number of jobs sent to a worker at a time
+CHUNK_SIZE = 64
+
+
+class Board():
+	#A loaded board and the precomputed data of the modes that need it, so
+	#they are built once per board (and process), with parameters:
+	#filename - the board file, the HPA* graph and ALT tables are cached next to it
+	#version - number of the load of the file, raised by whoever reloads it
+	#grid - the board as a Grid
+	#boardhash - content hash of the board
+	#uniform - True if every reachable cell has the same cost (Jump Point Search needs it)
+	def __init__(self, filename, version=0):
+		self.filename = filename
+		self.version = version
+		self.grid = load_board(filename)
+		self.boardhash = board_hash(self.grid)
+		self.uniform = self.grid.is_uniform()
+		self.hierarchical = None
+		self.landmarks = None
+		self.fields = FieldCache()
+
+	def get_hierarchical(self):
+		if self.hierarchical is None:
+			self.hierarchical = HierarchicalAStar(self.grid, self.filename)
+		return self.hierarchical
+
+	def get_landmarks(self):
+		if self.landmarks is None:
+			self.landmarks = Landmarks(self.grid, self.filename)
+		return self.landmarks
+
+
+def find_path(board, start=None, goal=None, algorithm="astar", budget=None, bound=1.0):
+	#Find a path on a Board from start to goal (nodes, default 'A' and 'B'),
+	#a start or goal on a blocked cell raises a ValueError.
+	#Returns a dictionary with the path (list of nodes, [] if there is none),
+	#its cost (None if there is none), the number of nodes expanded and the
+	#peak size of the open set (None for the distance field, which does not
+	#keep an indexed open set).
+	#The anytime mode (ARA* with the ALT heuristic) stops at the first path
+	#within bound times the optimal cost, or when budget (seconds) is used up,
+	#and also returns the suboptimality bound of its path (None if it has none).
+	#The best-first modes (astar, bfs, dijkstra, alt) also return the counters
+	#and phase times of their search as "stats", see instrument.py.
+	grid = board.grid
+	start = check_node(grid, grid.start if start is None else start)
+	goal = check_node(grid, grid.goal if goal is None else goal)
+	if algorithm in ("astar", "bfs", "dijkstra", "alt"):
+		bounds = board.get_landmarks().get_bounds(goal) if algorithm == "alt" else None
+		search = BestFirstSearch(grid, start, goal, heuristic=(algorithm != "dijkstra"), fifo=(algorithm == "bfs"), bounds=bounds)
+		search.process()
+		path, expanded = search.get_path(), search.expanded
+	elif algorithm == "hpa":
+		search = board.get_hierarchical()
+		path = list(search.get_path(start, goal))
+		expanded = search.expanded
+	elif algorithm in ("bidir-astar", "bidir-dijkstra"):
+		search = BidirectionalSearch(grid, start, goal, heuristic=(algorithm == "bidir-astar"))
+		search.process()
+		path, expanded = search.get_path(), sum(search.expanded)
+	elif algorithm == "field":
+		misses = board.fields.misses
+		search = None
+		path = board.fields.get_field(grid, goal, board.boardhash).get_path(start)
+		#a field is one Dijkstra over the board when it is computed, free afterwards
+		expanded = len(grid) if board.fields.misses > misses else 0
+	elif algorithm == "jps":
+		search = JumpPointSearch(grid, start, goal)
+		search.process()
+		path = search.get_path()
+		expanded = int((np.frombuffer(search.opened.pos, np.int32) == CLOSED).sum())
+	elif algorithm == "dstar":
+		search = DStarLite(grid, start, goal)
+		search.process()
+		path, expanded = search.get_path(), search.expanded
+	elif algorithm == "anytime":
+		search = AnytimeAStar(grid, start, goal, bounds=board.get_landmarks().get_bounds(goal))
+		search.process(budget=budget, bound=bound)
+		path, expanded = search.get_path(), search.expanded
+	else:
+		raise ValueError("unknown algorithm %r, expected one of %s" % (algorithm, ", ".join(ALGORITHMS)))
+	cost = sum(int(grid.costs[node]) for node in path[1:]) if path else None
+	found = {"path": path, "cost": cost, "expanded": expanded, "peak": get_peak(search)}
+	if algorithm == "anytime":
+		found["bound"] = search.bound
+	if isinstance(search, BestFirstSearch):
+		found["stats"] = search.stats.as_dict()
+	return found
+
+
+def find_cached_path(board, start=None, goal=None, algorithm="astar", cache=PATHS):
+	#find_path with the optimal modes answered from a path cache when the
+	#query, or a query with both endpoints on a cached path, was seen before.
+	#Cached answers expanded no nodes and have "cached" set.
+	if not is_cached(board, algorithm):
+		return find_path(board, start, goal, algorithm)
+	grid = board.grid
+	start = check_node(grid, grid.start if start is None else start)
+	goal = check_node(grid, grid.goal if goal is None else goal)
+	hit = cache.get(board.boardhash, start, goal)
+	if hit is not None:
+		path, cost = hit
+		return {"path": path, "cost": cost, "expanded": 0, "peak": None, "cached": True}
+	found = find_path(board, start, goal, algorithm)
+	cache.put(grid, found["path"], board.boardhash)
+	return found
+
+
+def is_cached(board, algorithm):
+	#True if the path cache answers the queries of a mode on a board. Jump
+	#Point Search raises its error on a weighted board, the paths that the
+	#other modes cached for the same query must not hide it
+	return algorithm in OPTIMAL and (algorithm != "jps" or board.uniform)
+
+
+def get_peak(search):
+	#return the peak open set size of a search, both directions together for
+	#the bidirectional ones and of the abstract graph for HPA*, None if the
+	#search has no open set
+	opened = getattr(search, "opened", None)
+	if opened is None:
+		return None
+	if isinstance(opened, tuple):
+		return sum(o.peak for o in opened)
+	return opened.peak
+
+
+def get_node(grid, coords):
+	#return the node of an (x, y) coordinate, None stays None
+	if coords is None:
+		return None
+	x, y = coords
+	if not (0 <= x < grid.grid_width and 0 <= y < grid.grid_height):
+		raise ValueError("(%d, %d) is outside the %dx%d board" % (x, y, grid.grid_width, grid.grid_height))
+	return check_node(grid, grid.get_index(x, y))
+
+
+def check_node(grid, node):
+	#return a start or goal node, a blocked cell can not be either
+	if grid.costs[node] == BLOCKED:
+		raise ValueError("(%d, %d) is a blocked cell" % grid.get_coords(node))
+	return node
+
+
+#the boards loaded by this process, keyed by file name
+BOARDS = {}
+
+
+def get_board(filename, version=0):
+	#return a board, loaded once per process and version
+	board = BOARDS.get(filename)
+	if board is None or board.version != version:
+		board = BOARDS[filename] = Board(filename, version)
+	return board
+
+
+def run_job(job):
+	#Run one manifest job and return its result line as a dictionary
+	number, spec = job
+	result = {"job": number, "board": spec.get("board"), "algorithm": spec.get("algorithm", "astar")}
+	begin = time.time()
+	try:
+		board = get_board(spec["board"])
+		grid = board.grid
+		start = get_node(grid, spec.get("start"))
+		goal = get_node(grid, spec.get("goal"))
+		budget = spec.get("budget_ms")
+		if result["algorithm"] in OPTIMAL:
+			found = find_cached_path(board, start, goal, result["algorithm"])
+		else:
+			found = find_path(board, start, goal, result["algorithm"], None if budget is None else budget / 1000.0, spec.get("bound", 1.0))
+		result.update(cost=found["cost"], length=len(found["path"]), expanded=found["expanded"])
+		for name in ("bound", "cached", "stats"):
+			if name in found:
+				result[name] = found[name]
+	except (KeyError, IndexError, TypeError, ValueError, IOError, OSError) as e:
+		result["error"] = "%s: %s" % (type(e).__name__, e)
+	result["seconds"] = round(time.time() - begin, 6)
+	return result
+
+
+def run_chunk(jobs):
+	return [run_job(job) for job in jobs]
+
+
+def read_manifest(lines):
+	#return the (number, job) pairs of the non-empty lines of a manifest
+	jobs = []
+	for line in lines:
+		line = line.strip()
+		if line:
+			jobs.append((len(jobs), json.loads(line)))
+	return jobs
+
+
+def get_chunks(jobs, size=CHUNK_SIZE):
+	#Group the jobs of the same board together, so a worker mostly needs few boards
+	jobs = sorted(jobs, key=lambda job: (str(job[1].get("board")), job[0]))
+	return [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+
+def run_batch(jobs, workers=None, out=sys.stdout):
+	#Run the jobs on a pool of worker processes and write every result as a
+	#JSON line as soon as its chunk is done
+	chunks = get_chunks(jobs)
+	workers = workers or multiprocessing.cpu_count()
+	if ProcessPoolExecutor is not None:
+		pool = ProcessPoolExecutor(workers)
+		results = pool.map(run_chunk, chunks)
+	else:
+		pool = multiprocessing.Pool(workers)
+		results = pool.imap_unordered(run_chunk, chunks)
+	try:
+		for chunk in results:
+			for result in chunk:
+				out.write(json.dumps(result, sort_keys=True) + "\n")
+			out.flush()
+	finally:
+		if ProcessPoolExecutor is not None:
+			pool.shutdown()
+		else:
+			pool.close()
+			pool.join()
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		sys.exit("usage: python pathfinding.py manifest.jsonl [workers]")
+	with open(sys.argv[1]) as f:
+		jobs = read_manifest(f)
+	run_batch(jobs, int(sys.argv[2]) if len(sys.argv) > 2 else None)
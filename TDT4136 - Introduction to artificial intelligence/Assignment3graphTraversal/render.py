@@ -0,0 +1,143 @@
+
+#Rendering of search results with numpy instead of one PIL call per cell.
+#Every cell gets its terrain colour from a lookup table indexed by its cost,
+#the one pixel per cell raster is upscaled with a single PIL resize and the
+#markers (path, start, goal, closed, opened) are stamped into the upscaled
+#image from boolean masks: a cell mask of the marked cells and a glyph mask
+#of the marker shape inside one cell. The glyphs are drawn, and scaled,
+#with the coordinates the scripts used for a 20 pixel cell.
+#The text overlay (out/outBoard*.txt) is written from the same masks.
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+#side of a cell in pixels, as in the original images
+CELL_SIZE = 20
+#large boards are drawn with smaller cells, so the image stays below this many pixels a side
+MAX_PIXELS = 4000
+#cells smaller than this are filled with the marker colour instead of a glyph
+MIN_GLYPH_SIZE = 5
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+
+def colour_table(colours, default=WHITE):
+	#return a (256, 3) uint8 lookup table from cost to colour
+	table = np.empty((256, 3), np.uint8)
+	table[:] = default
+	for cost, colour in colours.items():
+		table[cost] = colour
+	return table
+
+
+#terrain colours of the uniform boards (board-1-*) and the weighted boards (board-2-*)
+UNIFORM_COLOURS = colour_table({0: BLACK})
+WEIGHTED_COLOURS = colour_table({100: (30, 144, 255), 50: (169, 169, 169), 10: (0, 100, 0), 5: (152, 251, 152), 1: (205, 133, 63)})
+
+
+def draw_square(draw):
+	draw.rectangle(((7, 7), (7+4, 7+4)), fill=255, outline=255)
+
+
+def draw_dot(draw):
+	draw.ellipse(((7, 7), (7+4, 7+4)), fill=255, outline=255)
+
+
+def draw_cross(draw):
+	draw.line(((6, 6), (14, 14)), fill=255, width=1)
+	draw.line(((6, 14), (14, 6)), fill=255, width=1)
+
+
+def draw_star(draw):
+	draw.polygon(((5.5, 8), (9.5, 13), (13.5, 8)), fill=255)
+	draw.polygon(((5.5, 11), (9.5, 6), (13.5, 11)), fill=255)
+
+
+#the markers of each board type, from the highest priority to the lowest:
+#(name of the cell mask, glyph, colour). A cell only gets its first marker.
+UNIFORM_MARKERS = [
+	("path", draw_square, (30, 144, 255)),
+	("goal", draw_square, (124, 252, 0)),
+	("start", draw_square, (255, 0, 0)),
+]
+WEIGHTED_MARKERS = [
+	("path", draw_dot, BLACK),
+	("goal", draw_dot, (124, 252, 0)),
+	("start", draw_dot, (255, 0, 0)),
+	("closed", draw_cross, (40, 40, 40)),
+	("opened", draw_star, (55, 55, 55)),
+]
+
+
+def get_scale(grid):
+	#return the side of a cell in pixels for a board
+	return max(1, min(CELL_SIZE, MAX_PIXELS // max(grid.grid_width, grid.grid_height, 1)))
+
+
+def glyph_mask(glyph, scale):
+	#return the (scale, scale) boolean mask of a glyph
+	if scale < MIN_GLYPH_SIZE:
+		return np.ones((scale, scale), bool)
+	im = Image.new("L", (CELL_SIZE, CELL_SIZE), 0)
+	glyph(ImageDraw.Draw(im))
+	if scale != CELL_SIZE:
+		im = im.resize((scale, scale), Image.NEAREST)
+	return np.asarray(im) > 0
+
+
+def cell_mask(grid, cells):
+	#return a (grid_width, grid_height) boolean mask of cells given as a
+	#boolean node mask, node numbers or (x,y) coordinates
+	shape = (grid.grid_width, grid.grid_height)
+	if isinstance(cells, np.ndarray) and cells.dtype == bool:
+		return cells.reshape(shape)
+	mask = np.zeros(shape, bool)
+	cells = list(cells)
+	if not cells:
+		return mask
+	if isinstance(cells[0], tuple):
+		xs, ys = np.array(cells, np.int64).T
+	else:
+		xs, ys = np.divmod(np.array(cells, np.int64), grid.grid_height)
+	mask[xs, ys] = True
+	return mask
+
+
+def render(grid, colours, markers, cells, scale=None, frame=False):
+	#Draw a board and return the PIL image. cells maps the names used in
+	#markers to the marked cells (see cell_mask), missing names mark nothing.
+	scale = get_scale(grid) if scale is None else scale
+	width, height = grid.grid_width, grid.grid_height
+	terrain = colours[np.asarray(grid.costs).reshape(width, height)]
+	im = Image.fromarray(terrain, "RGB").resize((height * scale, width * scale), Image.NEAREST)
+	pixels = np.array(im)
+	#pixels as (x, row in the cell, y, column in the cell, rgb)
+	tiles = pixels.reshape(width, scale, height, scale, 3)
+	taken = np.zeros((width, height), bool)
+	for name, glyph, colour in markers:
+		if name not in cells:
+			continue
+		mask = cell_mask(grid, cells[name]) & ~taken
+		taken |= mask
+		#every pixel of the glyph in every marked cell, with one fancy index
+		xs, ys = np.nonzero(mask)
+		rows, columns = np.nonzero(glyph_mask(glyph, scale))
+		tiles[xs[:, None], rows[None, :], ys[:, None], columns[None, :]] = colour
+	if frame:
+		pixels[0, :] = BLACK
+		pixels[-1, :] = BLACK
+		pixels[:, 0] = BLACK
+		pixels[:, -1] = BLACK
+	return Image.fromarray(pixels, "RGB")
+
+
+def write_text(filename, lines, grid, path=None, mark="o"):
+	#Write the board as text, with mark on the path cells if a path is given
+	chars = np.frombuffer("".join(lines[:grid.grid_width]).encode("ascii"), np.uint8)
+	chars = chars.reshape(grid.grid_width, grid.grid_height).copy()
+	if path is not None:
+		chars[cell_mask(grid, path)] = ord(mark)
+	with open(filename, "w") as out:
+		for row in chars:
+			out.write(row.tobytes().decode("ascii") + "\n")
@@ -1,8 +1,95 @@
 #!/usr/bin/python
 
-import copy
 import itertools
+import multiprocessing
+import os
+import random
+import sys
 import timeit
+from collections import deque
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+# Puzzles per chunk sent to a bulk worker, and chunks per worker that
+# are read ahead of the results written (see solve_bulk)
+BULK_CHUNK = 64
+BULK_CHUNKS_AHEAD = 2
+
+# Subproblems per worker that a parallel search splits the search tree
+# into (see parallel_search), more of them balance the load better
+PARALLEL_SPLIT = 8
+
+# Failures of the first run of conflict_search before it restarts, the
+# later runs get this times the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+RESTART_FAILURES = 32
+# conflict_search keeps nogoods of at most this many decisions, and at
+# most this many of them
+NOGOOD_SIZE = 8
+NOGOOD_LIMIT = 20000
+
+def luby(i):
+    """Return term i (from 1) of the Luby sequence."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+def count_bits(mask):
+    """Return the number of values left in the domain bitmask 'mask'."""
+    return bin(mask).count('1')
+
+def get_bits(mask):
+    """Return the indices of the bits that are set in 'mask', lowest
+    first.
+    """
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+def get_components(edges):
+    """Return the strongly connected component of every node of the
+    directed graph 'edges' (node -> list of nodes), numbered by
+    Tarjan's algorithm.
+    """
+    index = {}
+    low = {}
+    component = {}
+    stack = []
+    onStack = set()
+    count = [0, 0]
+
+    def connect(node):
+        index[node] = low[node] = count[0]
+        count[0] += 1
+        stack.append(node)
+        onStack.add(node)
+        for adj in edges.get(node, []):
+            if adj not in index:
+                connect(adj)
+                low[node] = min(low[node], low[adj])
+            elif adj in onStack:
+                low[node] = min(low[node], index[adj])
+        if low[node] == index[node]:
+            while True:
+                adj = stack.pop()
+                onStack.discard(adj)
+                component[adj] = count[1]
+                if adj == node:
+                    break
+            count[1] += 1
+
+    for node in list(edges):
+        if node not in index:
+            connect(node)
+    return component
 
 class CSP:
     def __init__(self):
@@ -12,10 +99,74 @@ class CSP:
         # self.domains[i] is a list of legal values for variable i
         self.domains = {}
 
+        # self.values is a list of every value of the domains, and
+        # self.value_bits[value] its index in that list. During the search
+        # the domain of a variable is a bitmask of these indices
+        self.values = []
+        self.value_bits = {}
+
         # self.constraints[i][j] is a list of legal value pairs for
         # the variable pair (i, j)
         self.constraints = {}
 
+        # self.groups is a list of the all-different constraints, each a
+        # list of variables that must all take different values, and
+        # self.groups_of[i] the indices of the groups variable i is in
+        self.groups = []
+        self.groups_of = {}
+
+        # If self.matching is True, the all-different constraints are
+        # also filtered with a maximum matching (see filter_all_different),
+        # not only with the cheaper singles rules
+        self.matching = True
+
+        # self.supports[i][j][x] is the bitmask of the values of variable
+        # j that support value bit x of variable i under the constraint (i, j),
+        # compiled from self.constraints by compile_constraints(). It is
+        # None until the constraints are compiled, and set back to None
+        # whenever a variable or constraint is added
+        self.supports = None
+
+        # Also compiled by compile_constraints(): self.initial[i] is the
+        # bitmask of the full domain of variable i, self.arcs the list of
+        # all arcs and self.arcs_into[i] the list of the arcs into i
+        self.initial = {}
+        self.arcs = []
+        self.arcs_into = {}
+
+        # self.trail is a list of (variable, old domain bitmask) pairs,
+        # one for every domain change made during the search, so that
+        # the changes can be undone in place when the search backtracks
+        self.trail = []
+
+        # Propagation counts of the last search: the arcs revised, the
+        # revisions that removed values from a domain, and the runs of
+        # the all-different propagator
+        self.revisions = 0
+        self.prunings = 0
+        self.propagations = 0
+
+        # The state of conflict_search(). While self.explain is True
+        # every value removed from a domain gets an explanation in
+        # self.explanations[var][bit]: a bitmask of the decision levels
+        # whose decisions imply the removal. self.conflict is the
+        # explanation of the last failure of inference(), self.weights
+        # the failure count of every constraint (dom/wdeg, keyed by
+        # get_constraint_keys()) and self.nogoods maps a decision
+        # (var, bit) to the learned nogoods that contain it
+        self.explain = False
+        self.explanations = {}
+        self.full = {}
+        self.conflict = 0
+        self.weights = {}
+        self.nogoods = {}
+        self.decisions = {}
+        self.random = random.Random(0)
+        self.failuresLeft = None
+        self.restarts = 0
+        self.backjumps = 0
+        self.learned = 0
+
     def add_variable(self, name, domain):
         """Add a new variable to the CSP. 'name' is the variable name
         and 'domain' is a list of the legal values for the variable.
@@ -23,6 +174,12 @@ class CSP:
         self.variables.append(name)
         self.domains[name] = list(domain)
         self.constraints[name] = {}
+        self.groups_of[name] = []
+        for value in self.domains[name]:
+            if value not in self.value_bits:
+                self.value_bits[value] = len(self.values)
+                self.values.append(value)
+        self.supports = None
 
     def get_all_possible_pairs(self, a, b):
         """Get a list of all possible pairs (as tuples) of the values in
@@ -58,16 +215,54 @@ class CSP:
             self.constraints[i][j] = self.get_all_possible_pairs(self.domains[i], self.domains[j])
 
         # Next, filter this list of value pairs through the function
-        # 'filter_function', so that only the legal value pairs remain
-        self.constraints[i][j] = filter(lambda value_pair: filter_function(*value_pair), self.constraints[i][j])
+        # 'filter_function', so that only the legal value pairs remain.
+        # (The pairs are kept as a list, a lazy iterator would be used up
+        # by the first search.)
+        self.constraints[i][j] = list(filter(lambda value_pair: filter_function(*value_pair), self.constraints[i][j]))
+        self.supports = None
 
-    def add_all_different_constraint(self, variables):
+    def compile_constraints(self):
+        """Compile the legal value pairs of every constraint into
+        support bitmasks (see self.supports), so that the search finds
+        the supports of a value with one lookup and one AND instead of
+        scanning the list of pairs. The tables only depend on the
+        constraints, they are built once and shared by every search.
+        """
+        bits = self.value_bits
+        self.supports = {}
+        for i in self.constraints:
+            self.supports[i] = {}
+            for j in self.constraints[i]:
+                table = [0] * len(self.values)
+                for (x, y) in self.constraints[i][j]:
+                    table[bits[x]] |= 1 << bits[y]
+                self.supports[i][j] = table
+        self.initial = dict((var, self.get_mask(self.domains[var])) for var in self.variables)
+        self.arcs = self.get_all_arcs()
+        self.arcs_into = dict((var, self.get_all_neighboring_arcs(var)) for var in self.variables)
+
+    def get_mask(self, values):
+        """Return the domain bitmask of a list of values."""
+        mask = 0
+        for value in values:
+            mask |= 1 << self.value_bits[value]
+        return mask
+
+    def add_all_different_constraint(self, variables, pairwise=False):
         """Add an Alldiff constraint between all of the variables in the
-        list 'variables'.
+        list 'variables'. It is kept as one n-ary constraint, propagated
+        by propagate_all_different(). If 'pairwise' is True, it is added
+        as binary x != y constraints between every pair of the variables
+        instead, which AC-3 can only prune pair by pair.
         """
-        for (i, j) in self.get_all_possible_pairs(variables, variables):
-            if i != j:
-                self.add_constraint_one_way(i, j, lambda x, y: x != y)
+        if pairwise:
+            for (i, j) in self.get_all_possible_pairs(variables, variables):
+                if i != j:
+                    self.add_constraint_one_way(i, j, lambda x, y: x != y)
+            return
+        for var in variables:
+            self.groups_of[var].append(len(self.groups))
+        self.groups.append(list(variables))
 
 
 ####################################################################################################################
@@ -77,24 +272,124 @@ class CSP:
 ####################################################################################################################
 
 
-    def backtracking_search(self):
+    def backtracking_search(self, givens=None, domains=None):
         """This functions starts the CSP solver and returns the found
-        solution.
+        solution. 'givens' is an optional dictionary of values that some
+        of the variables are fixed to for this search only, so that one
+        CSP can solve many instances that only differ in their givens.
+        'domains' can give the domain bitmasks of all variables instead
+        (see get_initial_assignment).
+
+        During the search the domain of every variable is kept as an
+        integer bitmask, where bit k stands for the value
+        self.values[k]. The solution is returned as a dictionary
+        of lists of values like self.domains, or 'failure'.
         """
-        # Make a so-called "deep copy" of the dictionary containing the
-        # domains of the CSP variables. The deep copy is required to
-        # ensure that any changes made to 'assignment' does not have any
-        # side effects elsewhere.
-        assignment = copy.deepcopy(self.domains)
+        self.revisions = 0
+        self.prunings = 0
+        self.propagations = 0
+        assignment = self.get_initial_assignment(givens, domains)
+        if assignment is None:
+            return 'failure'
+
+        result = self.backtrack(assignment)
+        if result == 'failure':
+            return result
+        return dict((var, self.get_values(mask)) for var, mask in result.items())
+
+    def get_initial_assignment(self, givens=None, domains=None):
+        """Return the domain bitmasks the search starts from: the full
+        domain of every variable, with the 'givens' fixed and made arc
+        consistent. Returns None if the givens are inconsistent.
+
+        'domains' is an optional list of the domain bitmasks to start
+        from instead of the full domains, in the order of
+        self.variables. It is how a compiled model (see
+        get_sudoku_model) takes a puzzle: the per-puzzle setup is one
+        copy of the list.
+        """
+        if self.supports is None:
+            self.compile_constraints()
+        # The domains of the CSP itself are never changed by the search
+        if domains is None:
+            assignment = dict(self.initial)
+        else:
+            assignment = dict(itertools.izip(self.variables, domains))
+            if not all(domains):
+                return None
+        if givens:
+            for var, value in givens.items():
+                bit = self.value_bits.get(value)
+                if bit is None or not assignment[var] >> bit & 1:
+                    return None
+                assignment[var] = 1 << bit
+        self.trail = []
 
         # Run AC-3 on all constraints in the CSP, to weed out all of the
         # values that are not arc-consistent to begin with
-        #print assignment
-        self.inference(assignment, self.get_all_arcs())
+        if not self.inference(assignment, self.arcs, range(len(self.groups))):
+            return None
+        return assignment
 
-        # Call backtrack with the partial assignment 'assignment'
-        newAssignment = copy.deepcopy(assignment)
-        return self.backtrack(newAssignment)
+    def split(self, count, givens=None):
+        """Split the search tree into at least 'count' subproblems, if it
+        has that many nodes, for parallel_search(). The tree is expanded
+        a level at a time from the root, branching on the variable that
+        backtrack() would choose, and every subproblem is returned as the
+        givens of the decisions on its path, in the order that backtrack()
+        would visit them. Subproblems that fail in propagation are
+        dropped, a list without subproblems means there is no solution.
+        """
+        subproblems = [ dict(givens or {}) ]
+        while len(subproblems) < count:
+            children = []
+            expanded = False
+            for decisions in subproblems:
+                assignment = self.get_initial_assignment(decisions)
+                if assignment is None:
+                    continue
+                var = self.select_unassigned_variable(assignment)
+                if var is None:
+                    #A solution, it is kept as a subproblem of its own
+                    children.append(decisions)
+                    continue
+                expanded = True
+                for value in self.get_values(assignment[var]):
+                    child = dict(decisions)
+                    child[var] = value
+                    children.append(child)
+            subproblems = children
+            if not expanded:
+                break
+        return subproblems
+
+    def get_values(self, mask):
+        """Return the list of the values whose bits are set in the
+        domain bitmask 'mask'.
+        """
+        values = self.values
+        return [ values[k] for k in get_bits(mask) ]
+
+    def set_domain(self, assignment, var, mask, reason=None):
+        """Change the domain bitmask of variable 'var' and record the
+        old one on the trail. If 'reason' is given and self.explain is
+        True, it is kept as the explanation of every value removed.
+        """
+        if reason is not None and self.explain:
+            explanations = self.explanations[var]
+            for bit in get_bits(assignment[var] & ~mask):
+                explanations[bit] = reason
+        self.trail.append((var, assignment[var]))
+        assignment[var] = mask
+
+    def undo(self, assignment, mark):
+        """Undo the domain changes made since the trail had length
+        'mark', latest first.
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            (var, mask) = trail.pop()
+            assignment[var] = mask
 
     def backtrack(self, assignment):
         """The function 'Backtrack' from the pseudocode in the
@@ -102,119 +397,691 @@ class CSP:
 
         The function is called recursively, with a partial assignment of
         values 'assignment'. 'assignment' is a dictionary that contains
-        a list of all legal values for the variables that have *not* yet
-        been decided, and a list of only a single value for the
-        variables that *have* been decided.
-
-        When all of the variables in 'assignment' have lists of length
-        one, i.e. when all variables have been assigned a value, the
-        function should return 'assignment'. Otherwise, the search
-        should continue. When the function 'inference' is called to run
-        the AC-3 algorithm, the lists of legal values in 'assignment'
-        should get reduced as AC-3 discovers illegal values.
-
-        IMPORTANT: For every iteration of the for-loop in the
-        pseudocode, you need to make a deep copy of 'assignment' into a
-        new variable before changing it. Every iteration of the for-loop
-        should have a clean slate and not see any traces of the old
-        assignments and inferences that took place in previous
-        iterations of the loop.
-        """
-        #Test for completeness: If all domains have length 1 we are done, this means that all variables have a unique value associated to it.
+        the domain bitmask of every variable, with the bits of all legal
+        values for the variables that have *not* yet been decided, and
+        a single bit for the variables that *have* been decided.
+
+        When all of the variables in 'assignment' have a single bit
+        left, the function returns 'assignment'. Otherwise, the search
+        continues. When the function 'inference' is called to run the
+        AC-3 algorithm, the domains in 'assignment' get reduced as AC-3
+        discovers illegal values.
+
+        Every domain change is recorded on self.trail, so instead of
+        copying 'assignment' for every value that is tried, the changes
+        made for a value are undone in place before the next one.
+        """
         global numOfCalls
         global numOfFailures
         numOfCalls += 1
-        if all(len(item) == 1 for item in assignment.values()):
-            return assignment
-        
-        #This returns name of a variable with domain length greater than 1, i.e. a variable that is yet undecided
+        #This returns name of a variable with more than one value left, i.e. a variable that is yet undecided
         var = self.select_unassigned_variable(assignment)
+        #Test for completeness: If no variable is undecided we are done, every variable has a unique value associated to it.
+        if var is None:
+            return assignment
+
         #Loop through the values in the domain of the chosen variable
-        for value in assignment[var]:
-            #deep copy of assignment for each iteration, see note
-            newAssignment = copy.deepcopy(assignment)
+        for bit in get_bits(assignment[var]):
             #check if the variable and value pair is consistent
-            if self.consistent(newAssignment, var, value):
-                #If the pair is consistent, we want to try to assign it, but keep the old temporarily
-                temp = newAssignment[var]
-                newAssignment[var] = [value]
-                #If this new assignment does not lead to an inference failure (i.e. arc inconsistency), we continue by recursion if the assignment is valid
-                if self.inference(newAssignment, self.get_all_arcs()):
-                    result = self.backtrack(newAssignment)
+            if self.consistent(assignment, var, bit):
+                #Remember the length of the trail, so the assignment and its inferences can be undone
+                mark = len(self.trail)
+                self.set_domain(assignment, var, 1 << bit)
+                #If this new assignment does not lead to an inference failure (i.e. arc inconsistency), we continue by recursion if the assignment is valid.
+                #Only the domain of var changed, so propagation starts from the arcs into var and the all-different groups of var.
+                if self.inference(assignment, self.arcs_into[var], self.groups_of[var]):
+                    result = self.backtrack(assignment)
                     if result != 'failure':
                         return result
                 #We have an arc inconsistency, so we reset the assignment we tried.
-                newAssignment[var] = temp
+                self.undo(assignment, mark)
         #If none of the values in the domain of the chosen variable are consistent, return failure; we need to backtrack.
         numOfFailures+=1
         return 'failure'
-        pass
 
-    def consistent(self, assignment, var, value):
-        #Any assignment where two or more variables have the same value falsifies the constraint.
-        return all(assignment[constraint] != value for constraint in self.constraints[var])
+    def consistent(self, assignment, var, bit):
+        #The value is consistent if every decided neighbour of the variable has a value that is allowed together with it.
+        supports = self.supports[var]
+        for other in supports:
+            mask = assignment[other]
+            if mask & (mask - 1) == 0 and not supports[other][bit] & mask:
+                return False
+        #It must also differ from the decided variables of its all-different groups.
+        mask = 1 << bit
+        for group in self.groups_of[var]:
+            for other in self.groups[group]:
+                if other != var and assignment[other] == mask:
+                    return False
+        return True
 
     def select_unassigned_variable(self, assignment):
         """The function 'Select-Unassigned-Variable' from the pseudocode
         in the textbook. Should return the name of one of the variables
-        in 'assignment' that have not yet been decided, i.e. whose list
-        of legal values has a length greater than one.
+        in 'assignment' that have not yet been decided, i.e. whose
+        domain has more than one value left, or None if all of them have
+        been decided.
         """
-        #Return the name of one of the variables with smallest domain
-        return min([var for var in  assignment.keys() if len(assignment[var])>1], key=assignment.get)
-        pass
+        #Return the name of one of the variables with smallest domain (popcount of its bitmask)
+        best = None
+        bestSize = None
+        for var in self.variables:
+            size = count_bits(assignment[var])
+            if size > 1 and (bestSize is None or size < bestSize):
+                best = var
+                bestSize = size
+                if size == 2:
+                    break
+        return best
 
-    def inference(self, assignment, queue):
+    def inference(self, assignment, queue, groups=()):
         """The function 'AC-3' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
-        the lists of legal values for each undecided variable. 'queue'
-        is the initial queue of arcs that should be visited.
+        the domain bitmasks of the variables. 'queue' is the initial
+        list of arcs that should be visited, and 'groups' the indices of
+        the all-different constraints that should be propagated.
+
+        The arcs wait in a deque, and the set 'queued' holds the arcs
+        that are in it, so an arc is never queued twice. The groups wait
+        in a deque of their own and are propagated when no arc is left.
         """
-        while queue:
+        queued = set(queue)
+        queue = deque(queue)
+        groupsQueued = set(groups)
+        groupQueue = deque(groups)
+        while queue or groupQueue:
+            if not queue:
+                #Propagate an all-different group, and queue the arcs and other groups of every variable it changed
+                group = groupQueue.popleft()
+                groupsQueued.discard(group)
+                self.propagations += 1
+                changed = self.propagate_all_different(assignment, group)
+                if changed is None:
+                    if self.explain:
+                        self.weights[group] += 1
+                    return False
+                for i in changed:
+                    for k in self.arcs_into[i]:
+                        if k not in queued:
+                            queue.append(k)
+                            queued.add(k)
+                    for other in self.groups_of[i]:
+                        if other != group and other not in groupsQueued:
+                            groupQueue.append(other)
+                            groupsQueued.add(other)
+                continue
             #while queue is not empty pop first arc from queue
-            (i,j) = queue.pop(0)
+            arc = queue.popleft()
+            queued.discard(arc)
+            (i,j) = arc
+            self.revisions += 1
             #If the domain of i is reduced (i.e. revise returns true), we might be able to revise neighbours of i as well,
             #so we need to update neighbours of i (i.e. run inference on the neighbouring arcs)
             if self.revise(assignment, i, j):
+                self.prunings += 1
                 #if revision removes all possible values from domain, return false. This would imply no (arc) consistent solution.
-                if len(assignment[i]) == 0:
+                if assignment[i] == 0:
+                    if self.explain:
+                        self.conflict = self.get_reason(i, self.full[i])
+                        self.weights[min(i, j), max(i, j)] += 1
                     return False
-                #loop through neighbouring arcs of i different from j, add to queue at end.
-                for k in self.get_all_neighboring_arcs(i):
-                    if k != (i,j):
+                #loop through neighbouring arcs of i except the one from j (j was just used to revise i), add to queue at end if not queued.
+                for k in self.arcs_into[i]:
+                    if k[0] != j and k not in queued:
                         queue.append(k)
+                        queued.add(k)
+                for group in self.groups_of[i]:
+                    if group not in groupsQueued:
+                        groupQueue.append(group)
+                        groupsQueued.add(group)
             #If the arc is not revised, continue to next option in queue.
         #looped through the whole of queue without any false => return true
         return True
-        pass
 
     def revise(self, assignment, i, j):
         """The function 'Revise' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
-        the lists of legal values for each undecided variable. 'i' and
-        'j' specifies the arc that should be visited. If a value is
-        found in variable i's domain that doesn't satisfy the constraint
-        between i and j, the value should be deleted from i's list of
-        legal values in 'assignment'.
+        the domain bitmasks of the variables. 'i' and 'j' specifies the
+        arc that should be visited. If a value is found in variable i's
+        domain that doesn't satisfy the constraint between i and j, its
+        bit is cleared from i's domain in 'assignment' (and the old
+        domain is recorded on the trail).
         """
-        revised = False
+        support = self.supports[i][j]
+        maskJ = assignment[j]
+        mask = assignment[i]
         #loop through the values in the domain of i
-        for x in assignment[i]:
-            relationFound = False
-            #The following snippet evaluates if there exists an y in the domain of j such that 
-            #(x,y) satisfies the constraint between variable i and variable j. 
-            #If that is the case relationFound is set to True and we continue with next x in the domain of i.
+        for x in get_bits(mask):
+            #The value x is kept if there exists an y in the domain of j such that
+            #(x,y) satisfies the constraint between variable i and variable j, i.e. if its support bitmask meets the domain of j.
             #If not, then x is removed from the domain of i, because no pair (x,y) is valid.
-            for y in assignment[j]:
-                if (x,y) in self.constraints[i][j]:
-                    relationFound = True
-                    break
-            if relationFound == False:
-                assignment[i].remove(x)
-                revised = True
+            if not support[x] & maskJ:
+                mask &= ~(1 << x)
+                if self.explain:
+                    #x is gone because every value of j that supports it is gone
+                    self.explanations[i][x] = self.get_reason(j, support[x])
         #function returns True/False based on whether or not the domain of i is revised or not.
-        return revised
-        pass
+        if mask == assignment[i]:
+            return False
+        self.set_domain(assignment, i, mask)
+        return True
+
+    def propagate_all_different(self, assignment, group):
+        """Propagate the all-different constraint self.groups[group].
+        The fast path removes the values of decided variables from the
+        other variables of the group (naked singles) and, when every
+        value left in the group has to be used, decides a variable that
+        is the only one left with a value (hidden singles), until
+        neither rule changes anything. If self.matching is True the
+        group is then filtered with filter_all_different().
+
+        Returns the list of the variables whose domains changed, or None
+        if the constraint can not be satisfied.
+        """
+        variables = self.groups[group]
+        changed = []
+        while True:
+            #The explanation of what the group removes is taken as the explanations of every value it has lost so far
+            #(found when the group first removes something)
+            reason = None
+            #The values of the decided variables, two decided variables with the same value is a failure
+            taken = 0
+            for var in variables:
+                mask = assignment[var]
+                if mask & (mask - 1) == 0:
+                    if mask & taken:
+                        self.conflict = self.get_group_reason(assignment, variables)
+                        return None
+                    taken |= mask
+            revised = False
+            seen = 0
+            seenTwice = 0
+            for var in variables:
+                mask = assignment[var]
+                if mask & (mask - 1) and mask & taken:
+                    if reason is None:
+                        reason = self.get_group_reason(assignment, variables)
+                    mask &= ~taken
+                    self.set_domain(assignment, var, mask, reason)
+                    changed.append(var)
+                    revised = True
+                seenTwice |= seen & mask
+                seen |= mask
+            #Fewer values left than variables, they can not all be different
+            if count_bits(seen) < len(variables):
+                self.conflict = self.get_group_reason(assignment, variables)
+                return None
+            if count_bits(seen) == len(variables):
+                #Every value is needed, so a value that only one variable has left is the value of that variable
+                once = seen & ~seenTwice
+                for var in variables:
+                    mask = assignment[var]
+                    single = mask & once
+                    if single and single != mask:
+                        if single & (single - 1):
+                            self.conflict = self.get_group_reason(assignment, variables)
+                            return None
+                        self.set_domain(assignment, var, single, self.get_group_reason(assignment, variables))
+                        changed.append(var)
+                        revised = True
+            if not revised:
+                break
+        if self.matching:
+            filtered = self.filter_all_different(assignment, variables)
+            if filtered is None:
+                return None
+            changed.extend(filtered)
+        return changed
+
+    def filter_all_different(self, assignment, variables):
+        """Regin's filtering of an all-different constraint: a value can
+        stay in the domain of a variable only if some maximum matching
+        of the variables to different values uses it. Given one maximum
+        matching, that holds for the matched pairs, for the pairs on an
+        alternating path from a free value, and for the pairs in the
+        same strongly connected component of the graph with the matched
+        edges directed from variables to values and the others from
+        values to variables.
+
+        Returns the list of the variables whose domains changed, or None
+        if there is no matching that covers every variable.
+        """
+        #Maximum matching by augmenting paths, match[var] is the value bit of var and owner[bit] the variable
+        match = {}
+        owner = {}
+        for var in variables:
+            if not self.augment(assignment, var, match, owner, set()):
+                self.conflict = self.get_group_reason(assignment, variables)
+                return None
+        #Value bits and variables as nodes of one graph (variables are kept as ('var', name) so they can not clash with bits)
+        edges = {}
+        for var in variables:
+            edges[('var', var)] = [match[var]]
+            for bit in get_bits(assignment[var]):
+                if bit != match[var]:
+                    edges.setdefault(bit, []).append(('var', var))
+        #Nodes reached by alternating paths from the free values
+        free = [bit for bit in edges if not isinstance(bit, tuple) and bit not in owner]
+        reached = set(free)
+        stack = list(free)
+        while stack:
+            node = stack.pop()
+            for adj in edges.get(node, []):
+                if adj not in reached:
+                    reached.add(adj)
+                    stack.append(adj)
+        component = get_components(edges)
+        reason = None
+        changed = []
+        for var in variables:
+            mask = assignment[var]
+            keep = 1 << match[var]
+            for bit in get_bits(mask):
+                if bit in reached or component[bit] == component[('var', var)]:
+                    keep |= 1 << bit
+            if keep != mask:
+                if reason is None:
+                    reason = self.get_group_reason(assignment, variables)
+                self.set_domain(assignment, var, keep, reason)
+                changed.append(var)
+        return changed
+
+    def get_reason(self, var, mask):
+        """Return the explanation of the removal of the values in 'mask'
+        from the domain of 'var' (see self.explanations).
+        """
+        explanations = self.explanations[var]
+        reason = 0
+        for bit in get_bits(mask):
+            reason |= explanations.get(bit, 0)
+        return reason
+
+    def get_group_reason(self, assignment, variables):
+        """Return the explanation of every value the variables of an
+        all-different group have lost, 0 unless self.explain is True.
+        """
+        if not self.explain:
+            return 0
+        reason = 0
+        for var in variables:
+            reason |= self.get_reason(var, self.full[var] & ~assignment[var])
+        return reason
+
+    def get_constraint_keys(self, var):
+        """Return the keys in self.weights of the constraints of 'var':
+        (i, j) with i < j for a binary constraint, the index for an
+        all-different group.
+        """
+        return [ (min(var, other), max(var, other)) for other in self.constraints[var] ] + self.groups_of[var]
+
+    def conflict_search(self, givens=None, seed=0, restarts=True, domains=None):
+        """A stronger search than backtracking_search(), for the same
+        CSPs and with the same result. It uses
+        - dom/wdeg variable ordering: the variable with the smallest
+          domain size over the summed weights of its constraints, where
+          a constraint gains weight whenever its propagation fails
+        - least constraining value ordering
+        - conflict-directed backjumping: every removal has an
+          explanation (the decision levels that imply it), and a failed
+          subtree returns the levels its failure depends on, so the
+          search jumps back over decisions that played no part
+        - nogood recording: a conflict is kept as a nogood, the set of
+          decisions that can not hold together, and values that would
+          complete a nogood are skipped
+        - randomized restarts on a Luby schedule (RESTART_FAILURES
+          times luby(run) failures per run), keeping the weights and
+          nogoods and breaking ties with a random generator seeded with
+          'seed'
+        'givens' and 'domains' are as for backtracking_search().
+        """
+        global numOfCalls
+        global numOfFailures
+        self.revisions = 0
+        self.prunings = 0
+        self.propagations = 0
+        self.restarts = 0
+        self.backjumps = 0
+        self.learned = 0
+        self.random = random.Random(seed)
+        self.weights = {}
+        for var in self.variables:
+            for key in self.get_constraint_keys(var):
+                self.weights[key] = 1
+        self.nogoods = {}
+        if self.supports is None:
+            self.compile_constraints()
+        self.full = self.initial
+        self.explain = True
+        try:
+            run = 1
+            while True:
+                self.explanations = dict((var, {}) for var in self.variables)
+                self.decisions = {}
+                assignment = self.get_initial_assignment(givens, domains)
+                if assignment is None:
+                    return 'failure'
+                self.failuresLeft = RESTART_FAILURES * luby(run) if restarts else None
+                (result, conflict) = self.backjump(assignment, 1)
+                if result is not None:
+                    return dict((var, self.get_values(mask)) for var, mask in result.items())
+                if conflict is not None:
+                    return 'failure'
+                self.restarts += 1
+                run += 1
+        finally:
+            self.explain = False
+
+    def backjump(self, assignment, level):
+        """The recursive search of conflict_search() at decision level
+        'level'. Returns (assignment, 0) with the solution, (None,
+        conflict) if the subtree has no solution, where 'conflict' is
+        the bitmask of the decision levels the failure depends on, or
+        (None, None) when the failure budget of the run is used up.
+        """
+        global numOfCalls
+        global numOfFailures
+        numOfCalls += 1
+        var = self.select_weighted_variable(assignment)
+        if var is None:
+            return (assignment, 0)
+
+        levelBit = 1 << level
+        #The values the domain of var has already lost are part of every conflict of var
+        conflict = self.get_reason(var, self.full[var] & ~assignment[var])
+        for bit in self.order_values(assignment, var):
+            refuted = self.check_nogoods(assignment, var, bit)
+            if refuted is not None:
+                conflict |= refuted
+                continue
+            mark = len(self.trail)
+            self.decisions[level] = (var, bit)
+            self.set_domain(assignment, var, 1 << bit, levelBit)
+            if self.inference(assignment, self.arcs_into[var], self.groups_of[var]):
+                (result, found) = self.backjump(assignment, level + 1)
+                if result is not None:
+                    return (result, 0)
+                if found is None:
+                    self.undo(assignment, mark)
+                    return (None, None)
+            else:
+                found = self.conflict
+            self.undo(assignment, mark)
+            if not found & levelBit:
+                #The failure does not depend on this decision, so no other value of var can help
+                self.backjumps += 1
+                return (None, found)
+            self.record_nogood(found)
+            conflict |= found & ~levelBit
+        numOfFailures += 1
+        if self.failuresLeft is not None:
+            self.failuresLeft -= 1
+            if self.failuresLeft <= 0:
+                return (None, None)
+        return (None, conflict)
+
+    def select_weighted_variable(self, assignment):
+        """Return the undecided variable with the smallest domain size
+        over the summed weights of its constraints (dom/wdeg), ties
+        broken at random, or None if every variable is decided.
+        """
+        best = None
+        bestScore = None
+        for var in self.variables:
+            size = count_bits(assignment[var])
+            if size > 1:
+                #(a variable without constraints can take any value, it goes last)
+                weight = sum(self.weights[key] for key in self.get_constraint_keys(var))
+                score = (size / float(weight) if weight else float('inf'), self.random.random())
+                if bestScore is None or score < bestScore:
+                    best = var
+                    bestScore = score
+        return best
+
+    def order_values(self, assignment, var):
+        """Return the value bits of 'var', the ones that remove the
+        fewest values from the domains of its undecided neighbours first
+        (least constraining value), ties broken at random.
+        """
+        supports = self.supports[var]
+        scores = []
+        for bit in get_bits(assignment[var]):
+            removed = 0
+            for other in supports:
+                mask = assignment[other]
+                if mask & (mask - 1):
+                    removed += count_bits(mask & ~supports[other][bit])
+            for group in self.groups_of[var]:
+                for other in self.groups[group]:
+                    mask = assignment[other]
+                    if other != var and mask & (mask - 1) and mask >> bit & 1:
+                        removed += 1
+            scores.append((removed, self.random.random(), bit))
+        scores.sort()
+        return [ bit for (removed, tie, bit) in scores ]
+
+    def record_nogood(self, conflict):
+        """Keep the decisions at the levels of 'conflict' as a nogood,
+        if it is small enough.
+        """
+        levels = get_bits(conflict)
+        if len(levels) > NOGOOD_SIZE or self.learned >= NOGOOD_LIMIT:
+            return
+        nogood = tuple(self.decisions[level] for level in levels)
+        for decision in nogood:
+            self.nogoods.setdefault(decision, []).append(nogood)
+        self.learned += 1
+
+    def check_nogoods(self, assignment, var, bit):
+        """If giving 'var' the value 'bit' would complete a nogood (all
+        of its other decisions hold), return the explanation of those
+        decisions, else None.
+        """
+        for nogood in self.nogoods.get((var, bit), ()):
+            reason = 0
+            for (other, value) in nogood:
+                if other == var:
+                    continue
+                if assignment[other] != 1 << value:
+                    break
+                reason |= self.get_reason(other, self.full[other] & ~(1 << value))
+            else:
+                return reason
+        return None
+
+    def augment(self, assignment, var, match, owner, visited):
+        """Look for an augmenting path from variable 'var' and match it
+        along the path if one is found (see filter_all_different).
+        """
+        for bit in get_bits(assignment[var]):
+            if bit in visited:
+                continue
+            visited.add(bit)
+            if bit not in owner or self.augment(assignment, owner[bit], match, owner, visited):
+                owner[bit] = var
+                match[var] = bit
+                return True
+        return False
+
+
+####################################################################################################################
+####################################################################################################################
+####################################################################################################################
+####################################################################################################################
+####################################################################################################################
+
+
+class DancingLinks:
+    """Knuth's Algorithm X with Dancing Links for exact cover problems:
+    choose a set of rows such that every column is covered by exactly
+    one of them.
+
+    The matrix is a set of circular doubly linked lists of nodes, kept
+    in parallel lists indexed by node number instead of node objects:
+    node 0 is the root, nodes 1 to n the column headers, and the other
+    nodes the 1s of the rows. Covering a column unlinks it and the rows
+    that meet it, and uncovering links them back in reverse order.
+    """
+    def __init__(self, columns):
+        # left/right link the nodes of a row (and the column headers),
+        # up/down the nodes of a column, column[i] is the header of node
+        # i, row[i] the row index of node i, size[c] the number of nodes
+        # left in column c
+        headers = columns + 1
+        self.left = [ i - 1 for i in range(headers) ]
+        self.left[0] = columns
+        self.right = [ i + 1 for i in range(headers) ]
+        self.right[columns] = 0
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.row = [ None ] * headers
+        self.size = [ 0 ] * headers
+
+        # self.rows is a list of the names of the rows, by row index,
+        # self.first[i] the first node of row i and self.row_index[name]
+        # the index of a row
+        self.rows = []
+        self.first = []
+        self.row_index = {}
+
+        # Search counts of the last search: the calls of search(), the
+        # dead ends (a column no row can cover) and the solutions found
+        self.calls = 0
+        self.failures = 0
+        self.count = 0
+
+    def add_row(self, name, columns):
+        """Add a row named 'name' with 1s in the columns of the list
+        'columns' (numbered from 0).
+        """
+        first = len(self.left)
+        last = first + len(columns) - 1
+        index = len(self.rows)
+        self.rows.append(name)
+        self.first.append(first)
+        self.row_index[name] = index
+        for k, col in enumerate(columns):
+            node = first + k
+            header = col + 1
+            self.left.append(node - 1 if node > first else last)
+            self.right.append(node + 1 if node < last else first)
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.column.append(header)
+            self.row.append(index)
+            self.size[header] += 1
+
+    def cover(self, c):
+        """Remove column 'c' and every row that has a 1 in it."""
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        """Undo cover(c)."""
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def solve(self, limit=None, keep=True, chosen=()):
+        """Search for exact covers, stopping after 'limit' of them (all
+        of them if 'limit' is None). Returns the list of the solutions
+        found, each a list of row names, and sets self.count to their
+        number. If 'keep' is False the solutions are only counted, and
+        the list is empty.
+
+        'chosen' is a list of names of rows that every solution must
+        contain (like the givens of a Sudoku). They are put in the
+        solution before the search and taken out again after it, so the
+        matrix can be reused.
+        """
+        self.calls = 0
+        self.failures = 0
+        self.count = 0
+        solutions = []
+        partial = []
+        covered = []
+        for name in chosen:
+            node = self.first[self.row_index[name]]
+            columns = [ self.column[node] ]
+            j = self.right[node]
+            while j != node:
+                columns.append(self.column[j])
+                j = self.right[j]
+            #Two chosen rows that meet in a column can not be in one solution
+            if any(c in covered for c in columns):
+                break
+            for c in columns:
+                self.cover(c)
+                covered.append(c)
+            partial.append(node)
+        else:
+            self.search(partial, solutions if keep else None, limit)
+        for c in reversed(covered):
+            self.uncover(c)
+        return solutions
+
+    def search(self, partial, solutions, limit):
+        """Algorithm X from the rows chosen in 'partial'. Returns True
+        when 'limit' solutions have been found, after the matrix has
+        been restored.
+        """
+        self.calls += 1
+        right, down, column, size = self.right, self.down, self.column, self.size
+        if right[0] == 0:
+            self.count += 1
+            if solutions is not None:
+                solutions.append([ self.rows[self.row[node]] for node in partial ])
+            return limit is not None and self.count >= limit
+
+        #Choose the column with the fewest rows left
+        c = right[0]
+        best = c
+        while c != 0 and size[best] > 1:
+            if size[c] < size[best]:
+                best = c
+            c = right[c]
+        if size[best] == 0:
+            self.failures += 1
+            return False
+
+        self.cover(best)
+        done = False
+        r = down[best]
+        while r != best and not done:
+            partial.append(r)
+            j = right[r]
+            while j != r:
+                self.cover(column[j])
+                j = right[j]
+            done = self.search(partial, solutions, limit)
+            j = self.left[r]
+            while j != r:
+                self.uncover(column[j])
+                j = self.left[j]
+            partial.pop()
+            r = down[r]
+        self.uncover(best)
+        return done
 
 
 ####################################################################################################################
@@ -241,12 +1108,84 @@ def create_map_coloring_csp():
             csp.add_constraint_one_way(other_state, state, lambda i, j: i != j)
     return csp
 
-def create_sudoku_csp(filename):
+def create_random_sudoku_csp(box=3, holes=0.6, seed=0):
+    """Instantiate a CSP for a random Sudoku of box * box rows, columns
+    and boxes (9x9 for 3, 16x16 for 4, 25x25 for 5): a solved grid is
+    shuffled (digits, rows in a band, bands, columns in a stack and
+    stacks) and a share 'holes' of its cells is emptied. The puzzle
+    always has a solution, but not always only one.
+    """
+    rng = random.Random(seed)
+    size = box * box
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+
+    def shuffled_lines():
+        bands = list(range(box))
+        rng.shuffle(bands)
+        lines = []
+        for band in bands:
+            inner = list(range(box))
+            rng.shuffle(inner)
+            lines.extend(band * box + line for line in inner)
+        return lines
+
+    rows = shuffled_lines()
+    cols = shuffled_lines()
+    csp = CSP()
+    for row in range(size):
+        for col in range(size):
+            r = rows[row]
+            c = cols[col]
+            value = str(digits[(box * (r % box) + r // box + c) % size])
+            if rng.random() < holes:
+                csp.add_variable('%d-%d' % (row, col), map(str, range(1, size + 1)))
+            else:
+                csp.add_variable('%d-%d' % (row, col), [ value ])
+
+    add_sudoku_constraints(csp, box)
+    return csp
+
+def create_random_coloring_csp(nodes=60, colours=3, degree=4.5, seed=0):
+    """Instantiate a CSP for colouring a random graph of 'nodes' nodes
+    with 'colours' colours, with a planted solution: every node gets a
+    hidden colour, and nodes * degree / 2 edges join random nodes of
+    different hidden colours. For 3 colours the instances are hardest
+    around a degree of 4.5.
+    """
+    rng = random.Random(seed)
+    hidden = [ rng.randrange(colours) for node in range(nodes) ]
+    names = [ 'n%d' % node for node in range(nodes) ]
+    csp = CSP()
+    for name in names:
+        csp.add_variable(name, [ 'c%d' % colour for colour in range(colours) ])
+    edges = set()
+    while len(edges) < int(nodes * degree / 2):
+        a = rng.randrange(nodes)
+        b = rng.randrange(nodes)
+        if hidden[a] != hidden[b]:
+            edges.add((min(a, b), max(a, b)))
+    for (a, b) in sorted(edges):
+        csp.add_constraint_one_way(names[a], names[b], lambda i, j: i != j)
+        csp.add_constraint_one_way(names[b], names[a], lambda i, j: i != j)
+    return csp
+
+def read_sudoku_board(filename):
+    """Read a Sudoku board from a text file: nine lines of nine digits,
+    with 0 for an empty cell. If 'filename' is None the board is empty.
+    """
+    if filename is None:
+        return [ '0' * 9 ] * 9
+    return map(lambda x: x.strip(), open(filename, 'r'))
+
+def create_sudoku_csp(filename=None):
     """Instantiate a CSP representing the Sudoku board found in the text
-    file named 'filename' in the current directory.
+    file named 'filename' in the current directory. Without a file the
+    board is empty, and the puzzles are passed as givens to
+    CSP.backtracking_search().
     """
     csp = CSP()
-    board = map(lambda x: x.strip(), open(filename, 'r'))
+    board = read_sudoku_board(filename)
 
     for row in range(9):
         for col in range(9):
@@ -255,19 +1194,294 @@ def create_sudoku_csp(filename):
             else:
                 csp.add_variable('%d-%d' % (row, col), [ board[row][col] ])
 
-    for row in range(9):
-        csp.add_all_different_constraint([ '%d-%d' % (row, col) for col in range(9) ])
-    for col in range(9):
-        csp.add_all_different_constraint([ '%d-%d' % (row, col) for row in range(9) ])
-    for box_row in range(3):
-        for box_col in range(3):
+    add_sudoku_constraints(csp)
+    return csp
+
+def add_sudoku_constraints(csp, box=3):
+    """Add the all-different constraints of the rows, columns and boxes
+    of a Sudoku of box * box cells a side to a CSP with the variables
+    'r-c'.
+    """
+    size = box * box
+    for row in range(size):
+        csp.add_all_different_constraint([ '%d-%d' % (row, col) for col in range(size) ])
+    for col in range(size):
+        csp.add_all_different_constraint([ '%d-%d' % (row, col) for row in range(size) ])
+    for box_row in range(box):
+        for box_col in range(box):
             cells = []
-            for row in range(box_row * 3, (box_row + 1) * 3):
-                for col in range(box_col * 3, (box_col + 1) * 3):
+            for row in range(box_row * box, (box_row + 1) * box):
+                for col in range(box_col * box, (box_col + 1) * box):
                     cells.append('%d-%d' % (row, col))
             csp.add_all_different_constraint(cells)
 
-    return csp
+# The compiled Sudoku models of this process by box size, see get_sudoku_model
+sudokuModels = {}
+
+def get_sudoku_model(box=3, filename=None):
+    """Return the compiled CSP of an empty Sudoku of box * box cells a
+    side: its variables, constraints and support tables are built once
+    per size and process, and a puzzle only brings its initial domain
+    vector (see get_sudoku_domains). The model is only read by the
+    searches, so it can solve any number of puzzles.
+
+    If 'filename' is given the model is also kept in that file, and
+    loaded from it when it exists, so a new process skips the build.
+    """
+    model = sudokuModels.get(box)
+    if model is not None:
+        return model
+    if filename is not None and os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            (fileBox, model) = pickle.load(f)
+        if fileBox != box:
+            model = None
+    if model is None:
+        size = box * box
+        model = CSP()
+        for row in range(size):
+            for col in range(size):
+                model.add_variable('%d-%d' % (row, col), map(str, range(1, size + 1)))
+        add_sudoku_constraints(model, box)
+        model.compile_constraints()
+        if filename is not None:
+            #(written under another name first, so a process never reads half a file)
+            with open(filename + '.tmp', 'wb') as f:
+                pickle.dump((box, model), f, pickle.HIGHEST_PROTOCOL)
+            os.rename(filename + '.tmp', filename)
+    sudokuModels[box] = model
+    return model
+
+def get_sudoku_domains(model, puzzle):
+    """Return the initial domain vector of a puzzle (see get_givens) for
+    a model from get_sudoku_model(): the full domain for an empty cell
+    and the bit of its value for a given, 0 (no value) for a character
+    that is not a value of the model.
+    """
+    masks = dict((value, 1 << bit) for value, bit in model.value_bits.items())
+    masks['0'] = masks['.'] = model.initial[model.variables[0]]
+    return [ masks.get(value, 0) for value in puzzle ]
+
+def create_sudoku_exact_cover(filename=None):
+    """Instantiate the Sudoku board found in the text file named
+    'filename' as an exact cover problem for DancingLinks. A row is a
+    choice ('r-c', value) of a value for a cell, and the columns are the
+    324 conditions: every cell has a value, and every row, column and
+    box has every value once. A cell with a given only gets the row of
+    its value. Without a file the board is empty, and the puzzles are
+    passed as givens to exact_cover_search().
+    """
+    board = read_sudoku_board(filename)
+    links = DancingLinks(4 * 81)
+    for row in range(9):
+        for col in range(9):
+            box = (row // 3) * 3 + col // 3
+            for value in range(1, 10):
+                if board[row][col] in ('0', str(value)):
+                    links.add_row(('%d-%d' % (row, col), str(value)),
+                        [ row * 9 + col, 81 + row * 9 + value - 1, 162 + col * 9 + value - 1, 243 + box * 9 + value - 1 ])
+    return links
+
+def exact_cover_search(links, givens=None):
+    """Solve a Sudoku exact cover problem (see create_sudoku_exact_cover)
+    and return the solution in the format of CSP.backtracking_search(),
+    or 'failure'. 'givens' is an optional dictionary of cell values
+    ('r-c' -> value) that are added to the board for this search only.
+    """
+    chosen = []
+    for (var, value) in sorted((givens or {}).items()):
+        if (var, value) not in links.row_index:
+            return 'failure'
+        chosen.append((var, value))
+    solutions = links.solve(1, chosen=chosen)
+    if not solutions:
+        return 'failure'
+    return dict((var, [ value ]) for (var, value) in solutions[0])
+
+def get_givens(puzzle):
+    """Return the givens ('r-c' -> value) of a puzzle written as a
+    string of 81 digits, row by row, with 0 or . for an empty cell.
+    """
+    givens = {}
+    for k, value in enumerate(puzzle):
+        if value not in '0.':
+            givens['%d-%d' % (k // 9, k % 9)] = value
+    return givens
+
+def read_puzzles(lines):
+    """Read puzzles from an iterable of lines, one puzzle per line of 81
+    characters or nine lines of nine (the format of the board files),
+    and yield them as strings of 81 characters. Empty lines are
+    skipped.
+    """
+    rows = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) == 81 and not rows:
+            yield line
+        elif len(line) == 9:
+            rows.append(line)
+            if len(rows) == 9:
+                yield ''.join(rows)
+                rows = []
+        else:
+            raise ValueError('line %d is not a puzzle or a row of one' % number)
+    if rows:
+        raise ValueError('the input ends in the middle of a puzzle')
+
+def solve_puzzle(model, solver, puzzle):
+    """Solve a puzzle (see get_givens) with a prebuilt model, a CSP from
+    get_sudoku_model() or DancingLinks from create_sudoku_exact_cover().
+    Returns (solution as a string of 81 digits or 'failure', calls,
+    failures, seconds).
+    """
+    global numOfCalls
+    global numOfFailures
+    start = timeit.default_timer()
+    if solver == 'dlx':
+        solution = exact_cover_search(model, get_givens(puzzle))
+        calls = model.calls
+        failures = model.failures
+    else:
+        numOfCalls = 0
+        numOfFailures = 0
+        solution = model.backtracking_search(domains=get_sudoku_domains(model, puzzle))
+        calls = numOfCalls
+        failures = numOfFailures
+    seconds = timeit.default_timer() - start
+    if solution != 'failure':
+        solution = ''.join(solution['%d-%d' % (row, col)][0] for row in range(9) for col in range(9))
+    return (solution, calls, failures, seconds)
+
+# The solver and model of a bulk worker process, see init_bulk_worker
+bulkSolver = None
+bulkModel = None
+
+def init_bulk_worker(solver, modelFile=None):
+    """Build the model of a bulk worker process once, it is reused for
+    every puzzle the worker solves. 'modelFile' is the file the CSP
+    model is kept in, see get_sudoku_model.
+    """
+    global bulkSolver
+    global bulkModel
+    bulkSolver = solver
+    if solver == 'dlx':
+        bulkModel = create_sudoku_exact_cover()
+    else:
+        bulkModel = get_sudoku_model(3, modelFile)
+
+def solve_bulk_chunk(puzzles):
+    """Solve a chunk of puzzles in a bulk worker process."""
+    return [ solve_puzzle(bulkModel, bulkSolver, puzzle) for puzzle in puzzles ]
+
+def get_chunks(items, size):
+    """Yield the items of an iterable in lists of 'size' items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def solve_bulk(lines, out, solver='csp', workers=None, chunk=BULK_CHUNK, modelFile=None):
+    """Solve a stream of puzzles (see read_puzzles) on a pool of worker
+    processes and write a line per puzzle to the file 'out', in the
+    order of the input: the solution (or 'failure'), the search calls
+    and failures and the milliseconds of the search, separated by tabs.
+
+    The puzzles are sent to the workers in chunks, and only a few
+    chunks per worker are read ahead of the results that are written,
+    so the memory used does not grow with the input. Returns the
+    number of puzzles solved.
+
+    With a 'modelFile' the compiled CSP model is kept in that file (see
+    get_sudoku_model), it is built here if it does not exist yet and
+    only loaded by the workers.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    if solver != 'dlx' and modelFile is not None:
+        get_sudoku_model(3, modelFile)
+    pool = multiprocessing.Pool(workers, init_bulk_worker, (solver, modelFile))
+    pending = deque()
+    solved = 0
+
+    def write_next():
+        results = pending.popleft().get()
+        for (solution, calls, failures, seconds) in results:
+            out.write('%s\t%d\t%d\t%.3f\n' % (solution, calls, failures, 1000 * seconds))
+        return len(results)
+
+    try:
+        for puzzles in get_chunks(read_puzzles(lines), chunk):
+            pending.append(pool.apply_async(solve_bulk_chunk, (puzzles,)))
+            if len(pending) >= BULK_CHUNKS_AHEAD * workers:
+                solved += write_next()
+        while pending:
+            solved += write_next()
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return solved
+
+# The CSP of a parallel search worker process, see init_parallel_worker
+parallelCSP = None
+
+def init_parallel_worker(csp):
+    """Keep the CSP a parallel search worker process solves the
+    subproblems of.
+    """
+    global parallelCSP
+    parallelCSP = csp
+
+def solve_subproblem(givens):
+    """Solve one subproblem of CSP.split() in a parallel search worker.
+    Returns (solution or 'failure', calls, failures).
+    """
+    global numOfCalls
+    global numOfFailures
+    numOfCalls = 0
+    numOfFailures = 0
+    solution = parallelCSP.backtracking_search(givens)
+    return (solution, numOfCalls, numOfFailures)
+
+def parallel_search(csp, givens=None, workers=None, split=PARALLEL_SPLIT):
+    """Solve one CSP on a pool of worker processes (embarrassingly
+    parallel search): the search tree is split into about 'split'
+    subproblems per worker (see CSP.split), the workers take them in
+    the order of the sequential search, and the pool is stopped as soon
+    as one of them returns a solution.
+
+    Returns the solution in the format of CSP.backtracking_search(), or
+    'failure', and adds the calls and failures of the subproblems that
+    were finished to numOfCalls and numOfFailures.
+    """
+    global numOfCalls
+    global numOfFailures
+    workers = workers or multiprocessing.cpu_count()
+    subproblems = csp.split(split * workers, givens)
+    if not subproblems:
+        return 'failure'
+    pool = multiprocessing.Pool(workers, init_parallel_worker, (csp,))
+    result = 'failure'
+    try:
+        for (solution, calls, failures) in pool.imap_unordered(solve_subproblem, subproblems):
+            numOfCalls += calls
+            numOfFailures += failures
+            if solution != 'failure':
+                result = solution
+                break
+    finally:
+        #The subproblems still running are not needed any more
+        pool.terminate()
+        pool.join()
+    return result
 
 def print_sudoku_solution(solution):
     """Convert the representation of a Sudoku solution as returned from
@@ -283,29 +1497,83 @@ def print_sudoku_solution(solution):
         if row == 2 or row == 5:
             print '------+-------+------'
 
-userInput = input('Choose board (1-4): ')
-while userInput not in [1,2,3,4]:
-    userInput = input('Choose board (1-4): ')
-if userInput == 1:
-    choice = 'easy'
-elif userInput == 2:
-    choice = 'medium'
-elif userInput == 3:
-    choice = 'hard'
-elif userInput == 4:  
-    choice = 'veryhard'
-
-start = timeit.default_timer()
-csp = create_sudoku_csp("boards/" + choice + '.txt')
+# The counts of the CSP search, see CSP.backtrack
 numOfCalls = 0
 numOfFailures = 0
-if csp.backtracking_search() != 'failure':
-    print_sudoku_solution(csp.backtracking_search())
-else:
-    print 'Error: Failed'
-stop = timeit.default_timer()
-
-print '\n'
-print 'Number of calls: %d' % numOfCalls
-print 'Number of failures: %d' % numOfFailures
-print 'Runtime: %f seconds' % (stop - start)
+
+if __name__ == '__main__' and sys.argv[1:2] == ['bulk']:
+    # Usage: python sudokuSolve.py bulk input output [csp|dlx] [workers] [model file]
+    # Solves every puzzle of the input file (- for stdin), see solve_bulk,
+    # and writes the results to the output file (- for stdout). The
+    # compiled CSP model is kept in the model file if one is given
+    if len(sys.argv) < 4:
+        sys.exit('usage: python sudokuSolve.py bulk input output [csp|dlx] [workers] [model file]')
+    lines = sys.stdin if sys.argv[2] == '-' else open(sys.argv[2], 'r')
+    out = sys.stdout if sys.argv[3] == '-' else open(sys.argv[3], 'w')
+    start = timeit.default_timer()
+    solved = solve_bulk(lines, out, sys.argv[4] if len(sys.argv) > 4 else 'csp', int(sys.argv[5]) if len(sys.argv) > 5 else None,
+        modelFile=sys.argv[6] if len(sys.argv) > 6 else None)
+    out.flush()
+    sys.stderr.write('%d puzzles in %f seconds\n' % (solved, timeit.default_timer() - start))
+elif __name__ == '__main__':
+    # Usage: python sudokuSolve.py [csp|cbj|dlx|parallel] [--count]
+    # csp (the default) solves the board with CSP.backtracking_search(),
+    # cbj with CSP.conflict_search(), dlx with the exact cover backend and
+    # parallel with parallel_search() on a worker process per core.
+    # --count also counts the solutions of the board (with dlx), to check
+    # that it has a unique solution
+    solver = 'csp'
+    for name in ['cbj', 'dlx', 'parallel']:
+        if name in sys.argv[1:]:
+            solver = name
+    userInput = input('Choose board (1-4): ')
+    while userInput not in [1,2,3,4]:
+        userInput = input('Choose board (1-4): ')
+    if userInput == 1:
+        choice = 'easy'
+    elif userInput == 2:
+        choice = 'medium'
+    elif userInput == 3:
+        choice = 'hard'
+    elif userInput == 4:
+        choice = 'veryhard'
+
+    start = timeit.default_timer()
+    if solver == 'dlx':
+        links = create_sudoku_exact_cover("boards/" + choice + '.txt')
+        solution = exact_cover_search(links)
+        if solution != 'failure':
+            print_sudoku_solution(solution)
+        else:
+            print 'Error: Failed'
+        calls = links.calls
+        if '--count' in sys.argv[1:]:
+            links.solve(keep=False)
+    else:
+        csp = create_sudoku_csp("boards/" + choice + '.txt')
+        if solver == 'parallel':
+            solution = parallel_search(csp)
+        elif solver == 'cbj':
+            solution = csp.conflict_search()
+        else:
+            solution = csp.backtracking_search()
+        if solution != 'failure':
+            print_sudoku_solution(solution)
+        else:
+            print 'Error: Failed'
+    stop = timeit.default_timer()
+
+    print '\n'
+    if solver == 'dlx':
+        print 'Number of calls: %d' % calls
+        if '--count' in sys.argv[1:]:
+            print 'Number of solutions: %d' % links.count
+    else:
+        print 'Number of calls: %d' % numOfCalls
+        print 'Number of failures: %d' % numOfFailures
+        if solver in ['csp', 'cbj']:
+            print 'Number of revisions: %d (%d pruned a domain)' % (csp.revisions, csp.prunings)
+            print 'Number of all-different propagations: %d' % csp.propagations
+        if solver == 'cbj':
+            print 'Restarts: %d, backjumps: %d, nogoods: %d' % (csp.restarts, csp.backjumps, csp.learned)
+    print 'Runtime: %f seconds' % (stop - start)